@@ -0,0 +1,238 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.filters import IngredientFilter, RecipeFilter
+from api.membership import get_membership
+from api.pagination import LimitPageNumberPagination
+from api.serializers import (RecipeSerializer, SubscribeSerializer,
+                             TagSerializer, get_recipes_limit)
+from api.views import (IngredientViewSet, RecipeViewSet, TagViewSet,
+                       UserViewSet, attach_author_recipes, get_author_recipes,
+                       get_subscriptions)
+from recipes.ingredient_index import ingredient_index
+from recipes.models import AmountIngredient, Recipe, Tag
+
+# Параметры, которые обрабатывают только синхронные представления.
+SYNC_ONLY_PARAMS = frozenset((
+    LimitPageNumberPagination.cursor_query_param,
+    LimitPageNumberPagination.count_query_param,
+    "format",
+))
+
+
+async def authenticate(request):
+    """Пользователь по заголовку Authorization: Token <ключ>.
+
+    Возвращает None, если токен передан, но не подходит: такой
+    запрос обрабатывает синхронное представление.
+    """
+    header = request.headers.get("Authorization", "").split()
+    if not header or header[0].lower() != "token":
+        return AnonymousUser()
+    if len(header) != 2:
+        return None
+    try:
+        token = await Token.objects.select_related("user").aget(key=header[1])
+    except Token.DoesNotExist:
+        return None
+    return token.user if token.user.is_active else None
+
+
+def render(data):
+    return HttpResponse(
+        JSONRenderer().render(data), content_type="application/json",
+    )
+
+
+def async_read_view(sync_view):
+    """Асинхронное чтение с запасным синхронным представлением.
+
+    GET-запросы обрабатывает асинхронная функция. Остальные методы,
+    запросы с параметрами SYNC_ONLY_PARAMS и случаи, когда функция
+    вернула None (ошибки, 404), передаются синхронному представлению
+    DRF, чтобы ответы не отличались.
+    """
+
+    def decorator(handler):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if (request.method == "GET"
+                    and not SYNC_ONLY_PARAMS & request.GET.keys()):
+                user = await authenticate(request)
+                if user is not None:
+                    request.user = user
+                    data = await handler(request, *args, **kwargs)
+                    if data is not None:
+                        return render(data)
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+        view.csrf_exempt = True
+        return view
+
+    return decorator
+
+
+def set_prefetched(obj, name, values):
+    """Заполняет кеш связанных объектов, как prefetch_related."""
+    queryset = getattr(obj, name).all()
+    queryset._result_cache = values
+    queryset._prefetch_done = True
+    obj.__dict__.setdefault("_prefetched_objects_cache", {})[name] = queryset
+
+
+async def load_recipe_relations(recipes):
+    """Загружает теги и ингредиенты рецептов двумя запросами."""
+    ids = [recipe.id for recipe in recipes]
+    tags = {recipe_id: [] for recipe_id in ids}
+    links = Recipe.tags.through.objects.filter(
+        recipe_id__in=ids,
+    ).select_related("tag").order_by("-tag_id")
+    async for link in links:
+        tags[link.recipe_id].append(link.tag)
+    amounts = {recipe_id: [] for recipe_id in ids}
+    async for amount in AmountIngredient.objects.filter(
+        recipe_id__in=ids,
+    ).select_related("ingredient"):
+        amounts[amount.recipe_id].append(amount)
+    for recipe in recipes:
+        set_prefetched(recipe, "tags", tags[recipe.id])
+        set_prefetched(recipe, "amount_recipe", amounts[recipe.id])
+
+
+async def paginate(request, queryset):
+    """Страница объектов в формате LimitPageNumberPagination.
+
+    Возвращает None для неверного номера страницы.
+    """
+    paginator = LimitPageNumberPagination()
+    try:
+        page_size = int(request.GET[paginator.page_size_query_param])
+        if page_size < 1:
+            raise ValueError
+    except (KeyError, ValueError):
+        page_size = paginator.page_size
+    try:
+        number = int(request.GET.get(paginator.page_query_param, 1))
+    except ValueError:
+        return None
+    count = await queryset.acount()
+    if number < 1 or (number - 1) * page_size >= max(count, 1):
+        return None
+    offset = (number - 1) * page_size
+    objects = [obj async for obj in queryset[offset:offset + page_size]]
+    url = request.build_absolute_uri()
+    next_link = previous_link = None
+    if offset + page_size < count:
+        next_link = replace_query_param(
+            url, paginator.page_query_param, number + 1,
+        )
+    if number == 2:
+        previous_link = remove_query_param(url, paginator.page_query_param)
+    elif number > 2:
+        previous_link = replace_query_param(
+            url, paginator.page_query_param, number - 1,
+        )
+    return count, next_link, previous_link, objects
+
+
+def paginated(page, data):
+    count, next_link, previous_link, _ = page
+    return {
+        "count": count,
+        "next": next_link,
+        "previous": previous_link,
+        "results": data,
+    }
+
+
+def filter_recipes(request):
+    """Рецепты по фильтрам RecipeFilter или None при ошибке в фильтрах."""
+    get_membership(request)
+    filterset = RecipeFilter(
+        request.GET,
+        queryset=Recipe.objects.select_related("author"),
+        request=request,
+    )
+    if not filterset.is_valid():
+        return None
+    return filterset.qs
+
+
+@async_read_view(TagViewSet.as_view({"get": "list"}))
+async def tag_list(request):
+    tags = [tag async for tag in Tag.objects.all()]
+    return TagSerializer(tags, many=True).data
+
+
+@async_read_view(TagViewSet.as_view({"get": "retrieve"}))
+async def tag_detail(request, pk):
+    tag = await Tag.objects.filter(pk=pk).afirst()
+    return None if tag is None else TagSerializer(tag).data
+
+
+@async_read_view(IngredientViewSet.as_view({"get": "list"}))
+async def ingredient_list(request):
+    name = request.GET.get(IngredientFilter.search_param, "")
+    return await sync_to_async(ingredient_index.search)(name)
+
+
+@async_read_view(RecipeViewSet.as_view({"get": "list", "post": "create"}))
+async def recipe_list(request):
+    queryset = await sync_to_async(filter_recipes)(request)
+    if queryset is None:
+        return None
+    page = await paginate(request, queryset)
+    if page is None:
+        return None
+    recipes = page[-1]
+    await load_recipe_relations(recipes)
+    return paginated(page, RecipeSerializer(
+        recipes, many=True, context={"request": request},
+    ).data)
+
+
+@async_read_view(RecipeViewSet.as_view({
+    "get": "retrieve",
+    "put": "update",
+    "patch": "partial_update",
+    "delete": "destroy",
+}))
+async def recipe_detail(request, pk):
+    recipe = await Recipe.objects.select_related("author").filter(
+        pk=pk,
+    ).afirst()
+    if recipe is None:
+        return None
+    await load_recipe_relations([recipe])
+    await sync_to_async(get_membership)(request)
+    return RecipeSerializer(recipe, context={"request": request}).data
+
+
+@async_read_view(UserViewSet.as_view(
+    {"get": "subscriptions"}, **UserViewSet.subscriptions.kwargs,
+))
+async def subscription_list(request):
+    if not request.user.is_authenticated:
+        return None
+    try:
+        recipes_limit = get_recipes_limit(request.GET)
+    except ValidationError:
+        return None
+    page = await paginate(request, get_subscriptions(request.user))
+    if page is None:
+        return None
+    subscriptions = page[-1]
+    recipes = get_author_recipes(subscriptions, recipes_limit)
+    attach_author_recipes(
+        subscriptions, [recipe async for recipe in recipes],
+    )
+    return paginated(page, SubscribeSerializer(
+        subscriptions, many=True, context={"request": request},
+    ).data)
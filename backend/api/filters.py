@@ -1,7 +1,10 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe
+from recipes.models import Cart, Favorite, Recipe
+from recipes.scores import ORDERINGS, order_by_score
+from recipes.search import search_recipes
 
 
 class IngredientFilter(SearchFilter):
@@ -18,6 +21,10 @@ class RecipeFilter(filters.FilterSet):
     - Тегам
     - Избранным рецептам пользователя
     - Рецептам в корзине пользователя
+    - Тексту в названии, описании и ингредиентах
+
+    Параметр ordering сортирует рецепты по популярности (popular)
+    или популярности за последнее время (trending).
     """
 
     tags = filters.AllValuesMultipleFilter(field_name="tags__slug")
@@ -27,19 +34,43 @@ class RecipeFilter(filters.FilterSet):
     is_in_cart = filters.BooleanFilter(
         field_name="is_in_cart", method="filter_in_cart",
     )
+    search = filters.CharFilter(method="filter_search")
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in ORDERINGS],
+        method="filter_ordering",
+    )
 
     class Meta:
         model = Recipe
         fields = ("author",)
 
-    def filter_favorited(self, queryset, name, value):
-        """Фильтр по избранным рецептам."""
+    def filter_user_links(self, queryset, model, value):
+        """Рецепты, связанные с пользователем записью model.
+
+        Условие строится подзапросом EXISTS, а не списком id из кеша
+        связей: список не ограничен по размеру и в SQLite может
+        превысить допустимое число параметров запроса.
+        """
         if value and self.request.user.is_authenticated:
-            return queryset.filter(in_favorites__user=self.request.user)
+            return queryset.filter(
+                Exists(model.objects.filter(
+                    user=self.request.user, recipe=OuterRef("pk"),
+                )),
+            )
         return queryset
 
+    def filter_favorited(self, queryset, name, value):
+        """Фильтр по избранным рецептам."""
+        return self.filter_user_links(queryset, Favorite, value)
+
     def filter_in_cart(self, queryset, name, value):
         """Фильтр по рецептам в корзине пользователя."""
-        if value and self.request.user.is_authenticated:
-            return queryset.filter(cart__user=self.request.user)
-        return queryset
+        return self.filter_user_links(queryset, Cart, value)
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск с сортировкой по релевантности."""
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        """Сортировка по предрассчитанным оценкам."""
+        return order_by_score(queryset, value)
@@ -0,0 +1,255 @@
+import base64
+import json
+import os
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from api.management.commands.load_test import percentile
+from recipes.management.commands.seed_benchmark import IMAGE
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import CustomUser
+
+BASELINE_PATH = os.path.join(settings.BASE_DIR, "benchmark_baseline.json")
+
+# Имя замера: (метод, адрес, запрос от анонимного пользователя).
+# В адресе подставляются параметры из get_context.
+ENDPOINTS = {
+    "recipe_list": ("get", "/api/recipes/", False),
+    "recipe_list_anonymous": ("get", "/api/recipes/", True),
+    "recipe_list_page": ("get", "/api/recipes/?page=10", False),
+    "recipe_list_filtered": (
+        "get", "/api/recipes/?tags={tag}&is_favorited=1", False,
+    ),
+    "recipe_list_author": ("get", "/api/recipes/?author={author}", False),
+    "recipe_list_popular": ("get", "/api/recipes/?ordering=popular", False),
+    "recipe_detail": ("get", "/api/recipes/{recipe}/", False),
+    "subscriptions": (
+        "get", "/api/users/subscriptions/?recipes_limit=3", False,
+    ),
+    "download_shopping_cart": (
+        "get", "/api/recipes/download_shopping_cart/", False,
+    ),
+    "shopping_list": ("get", "/api/recipes/shopping_list/", False),
+    "ingredient_search": ("get", "/api/ingredients/?name={ingredient}", False),
+    "recipe_create": ("post", "/api/recipes/", False),
+}
+
+
+class QueryCounter:
+    """Обертка execute_wrapper, считающая запросы к базе."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def get_context(user):
+    """Параметры адресов по данным пользователя."""
+    recipe = Recipe.objects.filter(amount_recipe__isnull=False).first()
+    ingredient = Ingredient.objects.filter(
+        amount_ingredient__recipe=recipe,
+    ).first()
+    subscription = user.subscriber.order_by("pk").first()
+    return {
+        "tag": Tag.objects.order_by("pk").values_list("slug", flat=True)[0],
+        "author": subscription.author_id if subscription else user.pk,
+        "recipe": recipe.pk,
+        "ingredient": ingredient.name[:3],
+        "ingredient_id": ingredient.pk,
+    }
+
+
+def get_host():
+    """Имя хоста из ALLOWED_HOSTS для запросов тестового клиента."""
+    host = settings.ALLOWED_HOSTS[0].lstrip(".")
+    return "localhost" if host in ("", "*") else host
+
+
+class Command(BaseCommand):
+    """Бенчмарк основных запросов API внутри процесса.
+
+    Запросы выполняются тестовым клиентом Django через все
+    промежуточные слои без сети. Для каждого замера выводятся
+    задержки p50/p95/p99, число запросов к базе и пропускная
+    способность в одном потоке. Результаты сравниваются с
+    сохраненными в JSON-файле: регрессией считается рост p95
+    больше чем на --tolerance или рост числа запросов к базе.
+    Данные для замеров создает команда seed_benchmark.
+    """
+
+    help = "Измеряет задержки и число запросов основных адресов API."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            dest="endpoints",
+            choices=ENDPOINTS,
+            help="Замер из списка, можно указать несколько раз.",
+        )
+        parser.add_argument("--iterations", type=int, default=100)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--user",
+            help="Имя пользователя, от которого идут запросы. "
+                 "По умолчанию первый пользователь с подписками "
+                 "и корзиной.",
+        )
+        parser.add_argument("--baseline", default=BASELINE_PATH)
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Сохранить результаты как базовые.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Допустимый рост p95 относительно базового.",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("Число повторов должно быть больше 0.")
+        user = self.get_user(options["user"])
+        context = get_context(user)
+        token, _ = Token.objects.get_or_create(user=user)
+        host = get_host()
+        self.clients = {
+            False: Client(
+                HTTP_HOST=host, HTTP_AUTHORIZATION=f"Token {token.key}",
+            ),
+            True: Client(HTTP_HOST=host),
+        }
+        self.payload = self.get_recipe_payload(context)
+        self.created = []
+        results = {}
+        try:
+            for name in options["endpoints"] or ENDPOINTS:
+                method, path, anonymous = ENDPOINTS[name]
+                results[name] = self.measure(
+                    self.clients[anonymous], method, path.format(**context),
+                    options["iterations"], options["warmup"],
+                )
+        finally:
+            for recipe_id in self.created:
+                self.clients[False].delete(f"/api/recipes/{recipe_id}/")
+        baseline = self.load_baseline(options["baseline"])
+        regressions = self.report(results, baseline, options["tolerance"])
+        if options["save_baseline"]:
+            with open(options["baseline"], "w", encoding="utf-8") as file:
+                json.dump({**baseline, **results}, file, indent=2)
+            self.stdout.write(f"Базовые результаты: {options['baseline']}")
+        elif regressions:
+            raise CommandError(f"Регрессии: {', '.join(regressions)}.")
+
+    def get_user(self, username):
+        users = CustomUser.objects.order_by("pk")
+        if username:
+            user = users.filter(username=username).first()
+        else:
+            user = users.filter(
+                subscriber__isnull=False, cart_user__isnull=False,
+            ).first()
+        if user is None:
+            raise CommandError(
+                "Пользователь не найден, заполните базу командой "
+                "seed_benchmark.",
+            )
+        return user
+
+    def get_recipe_payload(self, context):
+        image = base64.b64encode(IMAGE).decode()
+        return json.dumps({
+            "name": "Бенчмарк",
+            "text": "Рецепт, созданный бенчмарком.",
+            "cooking_time": 10,
+            "image": f"data:image/png;base64,{image}",
+            "tags": list(Tag.objects.values_list("pk", flat=True)[:2]),
+            "ingredients": [{"id": context["ingredient_id"], "amount": 10}],
+        })
+
+    def send(self, client, method, path):
+        if method == "post":
+            response = client.post(
+                path, self.payload, content_type="application/json",
+            )
+        else:
+            response = getattr(client, method)(path)
+        response.getvalue()
+        if response.status_code >= 400:
+            raise CommandError(
+                f"{method.upper()} {path}: ответ {response.status_code}.",
+            )
+        if method == "post":
+            self.created.append(response.json()["id"])
+        return response
+
+    def measure(self, client, method, path, iterations, warmup):
+        """Задержки в миллисекундах и число запросов к базе."""
+        for _ in range(warmup):
+            self.send(client, method, path)
+        latencies = []
+        queries = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            counter = QueryCounter()
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                request_started = time.perf_counter()
+                self.send(client, method, path)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(counter.count)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            "p50": round(percentile(latencies, 0.5) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+            "queries": max(queries),
+            "rps": round(iterations / elapsed, 1),
+        }
+
+    def load_baseline(self, path):
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def report(self, results, baseline, tolerance):
+        """Выводит таблицу результатов, возвращает имена регрессий."""
+        self.stdout.write(
+            f"{'замер':<24}{'p50':>9}{'p95':>9}{'p99':>9}"
+            f"{'запросы':>9}{'rps':>9}  к базовому",
+        )
+        regressions = []
+        for name, result in results.items():
+            line = (
+                f"{name:<24}{result['p50']:>9}{result['p95']:>9}"
+                f"{result['p99']:>9}{result['queries']:>9}"
+                f"{result['rps']:>9}"
+            )
+            base = baseline.get(name)
+            if base:
+                change = result["p95"] / base["p95"] - 1 if base["p95"] else 0
+                line += (
+                    f"  p95 {change:+.0%}, "
+                    f"запросы {result['queries'] - base['queries']:+d}"
+                )
+                if change > tolerance or result["queries"] > base["queries"]:
+                    regressions.append(name)
+                    line = self.style.ERROR(line)
+            self.stdout.write(line)
+        return regressions
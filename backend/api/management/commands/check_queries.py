@@ -0,0 +1,328 @@
+import base64
+import difflib
+import json
+import os
+import re
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from api.management.commands.benchmark import get_host
+from api.urls import router_v1
+from recipes import cookable
+from recipes.cache_tags import TAG_KEY, membership_tag
+from recipes.management.commands.seed_benchmark import IMAGE
+from recipes.models import (AmountIngredient, Cart, Favorite, Ingredient,
+                            Recipe, Tag)
+from recipes.shopping_list import rebuild
+from users.models import CustomUser, Subscription
+
+SNAPSHOT_DIR = os.path.join(settings.BASE_DIR, "query_snapshots")
+PAGE_SIZES = (2, 10)
+# Количество авторов, рецептов и подписок больше наибольшей страницы.
+FIXTURE_SIZE = 12
+# Ингредиентов в рецепте: лимиты запросов проверяются на рецептах
+# реального размера, а не на минимальных.
+RECIPE_INGREDIENTS = 15
+SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+
+
+class Rollback(Exception):
+    """Откат тестовых данных после проверки."""
+
+
+class QueryRecorder:
+    """Обертка execute_wrapper, сохраняющая SQL без параметров."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(SAVEPOINT.sub('"savepoint"', sql))
+        return execute(sql, params, many, context)
+
+
+def create_fixture():
+    """Тестовые данные: авторы с рецептами и подписанный на них читатель.
+
+    Все рецепты читателя в избранном и в корзине, поэтому страницы
+    всех списков заполнены целиком.
+    """
+    reader = CustomUser.objects.create(
+        username="check_queries_reader", email="check_queries@example.com",
+    )
+    authors = CustomUser.objects.bulk_create(
+        CustomUser(
+            username=f"check_queries_{number}",
+            email=f"check_queries_{number}@example.com",
+        )
+        for number in range(FIXTURE_SIZE)
+    )
+    tags = Tag.objects.bulk_create(
+        Tag(name=f"check_queries_{number}", color=f"#{uuid.uuid4().hex[:6]}",
+            slug=f"check_queries_{number}")
+        for number in range(2)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f"check_queries_{number}", measurement_unit="г")
+        for number in range(RECIPE_INGREDIENTS * 2)
+    )
+    image = Recipe._meta.get_field("image")
+    image_name = image.storage.save(
+        f"{image.upload_to}check_queries.png", ContentFile(IMAGE),
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(author=author, name=author.username, text="text",
+               image=image_name, cooking_time=10)
+        for author in authors
+    )
+    for recipe in recipes:
+        recipe.tags.set(tags)
+    AmountIngredient.objects.bulk_create(
+        AmountIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for recipe in recipes
+        for ingredient in ingredients[:RECIPE_INGREDIENTS]
+    )
+    for model in (Favorite, Cart):
+        model.objects.bulk_create(
+            model(user=reader, recipe=recipe) for recipe in recipes
+        )
+    Subscription.objects.bulk_create(
+        Subscription(user=reader, author=author) for author in authors
+    )
+    rebuild((reader.pk,))
+    cookable.bump_version()
+    return reader, {
+        CustomUser: authors[0],
+        Recipe: recipes[0],
+        Tag: tags[0],
+        Ingredient: ingredients[0],
+    }, {
+        "ingredients": ",".join(
+            str(ingredient.pk)
+            for ingredient in ingredients[:RECIPE_INGREDIENTS]
+        ),
+    }
+
+
+def recipe_payload(ingredients, tags):
+    """Данные рецепта для создания и изменения через API."""
+    return {
+        "name": "check_queries",
+        "text": "text",
+        "cooking_time": 10,
+        "image": "data:image/png;base64,"
+        + base64.b64encode(IMAGE).decode(),
+        "tags": [tag.pk for tag in tags],
+        "ingredients": [
+            {"id": ingredient.pk, "amount": 1} for ingredient in ingredients
+        ],
+    }
+
+
+def get_get_routes():
+    """Адреса GET из router_v1: имя, представление, detail."""
+    for _, viewset, basename in router_v1.registry:
+        for route in router_v1.get_routes(viewset):
+            action = route.mapping["get"] if "get" in route.mapping else None
+            if action and hasattr(viewset, action):
+                yield route.name.format(basename=basename), viewset, \
+                    route.detail
+
+
+class Command(BaseCommand):
+    """Проверка числа запросов к базе для адресов API.
+
+    Каждый GET-адрес из router_v1 запрашивается на тестовых данных,
+    списки - со страницами из PAGE_SIZES. Число запросов не должно
+    расти с размером страницы. SQL запросов без параметров сверяется
+    со снимком для текущей базы данных в query_snapshots, чтобы
+    изменения запросов были видны в ревью. Затем выполняются запросы
+    на изменение: создание, изменение и удаление рецепта
+    с RECIPE_INGREDIENTS ингредиентами, избранное, корзина и подписки.
+    Число запросов каждого адреса сверяется с лимитом из
+    QUERY_BUDGETS. Тестовые данные создаются в транзакции
+    и откатываются.
+    """
+
+    help = "Проверяет, что число запросов не зависит от размера страницы."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="Перезаписать снимок SQL.",
+        )
+
+    def handle(self, *args, **options):
+        path = os.path.join(SNAPSHOT_DIR, f"{connection.vendor}.sql")
+        self.reader_id = None
+        try:
+            # Превышения лимитов собираются в общий отчет командой,
+            # а не прерывают запрос ошибкой.
+            with transaction.atomic(), override_settings(
+                QUERY_BUDGET_ACTION="log",
+            ):
+                errors, snapshot = self.check_routes()
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            if self.reader_id is not None:
+                cache.delete(
+                    TAG_KEY.format(tag=membership_tag(self.reader_id)),
+                )
+        if options["update"]:
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(snapshot)
+            self.stdout.write(f"Снимок SQL сохранен: {path}")
+        else:
+            errors += self.compare_snapshot(path, snapshot)
+        if errors:
+            raise CommandError("\n".join(errors))
+        self.stdout.write(self.style.SUCCESS("Число запросов в норме."))
+
+    def check_routes(self):
+        reader, objects, params = create_fixture()
+        self.objects = objects
+        self.reader_id = reader.pk
+        token = Token.objects.create(user=reader)
+        self.client = Client(
+            HTTP_HOST=get_host(), HTTP_AUTHORIZATION=f"Token {token.key}",
+        )
+        errors = []
+        snapshot = []
+        for name, viewset, detail in get_get_routes():
+            if detail:
+                obj = objects[viewset.queryset.model]
+                lookup = viewset.lookup_url_kwarg or viewset.lookup_field
+                url = reverse(f"api:{name}", kwargs={lookup: obj.pk})
+                # Первый запрос заполняет кеши и не учитывается.
+                self.record(url, {})
+                queries = self.record(url, {})
+            else:
+                url = reverse(f"api:{name}")
+                self.record(url, {**params, "limit": PAGE_SIZES[0]})
+                first, *_, queries = (
+                    self.record(url, {**params, "limit": size})
+                    for size in PAGE_SIZES
+                )
+                if len(queries) > len(first):
+                    errors.append(
+                        f"{name}: {len(first)} запросов при limit="
+                        f"{PAGE_SIZES[0]} и {len(queries)} при limit="
+                        f"{PAGE_SIZES[-1]}",
+                    )
+            self.stdout.write(f"{name}: {len(queries)}")
+            snapshot.append(f"-- {name}: {len(queries)}")
+            snapshot.extend(f"{sql};" for sql in queries)
+            errors += self.check_budget("GET", name, queries)
+        errors += self.check_writes(reader)
+        return errors, "\n".join(snapshot) + "\n"
+
+    def get_write_requests(self, reader):
+        """Запросы на изменение: метод, имя адреса, URL и данные."""
+        recipe = self.objects[Recipe]
+        author = self.objects[CustomUser]
+        tags = Tag.objects.filter(name__startswith="check_queries_")
+        ingredients = list(Ingredient.objects.filter(
+            name__startswith="check_queries_",
+        ).order_by("pk"))
+        first = ingredients[:RECIPE_INGREDIENTS]
+        second = ingredients[RECIPE_INGREDIENTS:]
+        recipe_ids = {"ids": list(
+            Recipe.objects.filter(
+                author__username__startswith="check_queries_",
+            ).values_list("pk", flat=True),
+        )}
+        author_ids = {"ids": list(
+            CustomUser.objects.filter(
+                username__startswith="check_queries_",
+            ).exclude(pk=reader.pk).values_list("pk", flat=True),
+        )}
+        yield "POST", "recipes-list", reverse("api:recipes-list"), \
+            recipe_payload(first, tags)
+        # Генератор продолжается после выполнения запроса на создание.
+        new = {"pk": Recipe.objects.latest("pk").pk}
+        # Рецепт в корзине: изменение и удаление меняют списки покупок.
+        for action in ("favorite", "shopping-cart"):
+            url = reverse(f"api:recipes-{action}", kwargs=new)
+            yield "POST", f"recipes-{action}", url, None
+        new = reverse("api:recipes-detail", kwargs=new)
+        # Изменение заменяет все ингредиенты рецепта.
+        yield "PATCH", "recipes-detail", new, recipe_payload(second, tags)
+        yield "PUT", "recipes-detail", new, recipe_payload(first, tags)
+        for action in ("favorite", "shopping-cart"):
+            url = reverse(f"api:recipes-{action}", kwargs={"pk": recipe.pk})
+            yield "DELETE", f"recipes-{action}", url, None
+            yield "POST", f"recipes-{action}", url, None
+            url = reverse(f"api:recipes-bulk-{action}")
+            yield "DELETE", f"recipes-bulk-{action}", url, recipe_ids
+            yield "POST", f"recipes-bulk-{action}", url, recipe_ids
+        url = reverse("api:users-subscribe", kwargs={"id": author.pk})
+        yield "DELETE", "users-subscribe", url, None
+        yield "POST", "users-subscribe", url, None
+        url = reverse("api:users-bulk-subscribe")
+        yield "DELETE", "users-bulk-subscribe", url, author_ids
+        yield "POST", "users-bulk-subscribe", url, author_ids
+        yield "DELETE", "recipes-detail", new, None
+
+    def check_writes(self, reader):
+        """Сверка числа запросов на изменение с QUERY_BUDGETS."""
+        errors = []
+        for method, name, url, data in self.get_write_requests(reader):
+            queries = self.record(url, data, method)
+            self.stdout.write(f"{method} {name}: {len(queries)}")
+            errors += self.check_budget(method, name, queries)
+        return errors
+
+    def check_budget(self, method, name, queries):
+        budget = settings.QUERY_BUDGETS.get(f"{method} api:{name}")
+        if budget is None or len(queries) <= budget:
+            return []
+        return [
+            f"{method} {name}: {len(queries)} запросов к базе "
+            f"при лимите {budget}",
+        ]
+
+    def record(self, url, params, method="GET"):
+        """SQL запросов к базе при запросе к адресу."""
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for database in connections.all():
+                stack.enter_context(database.execute_wrapper(recorder))
+            if method == "GET":
+                response = self.client.get(url, params)
+            else:
+                response = self.client.generic(
+                    method, url, json.dumps(params) if params else "",
+                    content_type="application/json",
+                )
+            response.getvalue()
+        if response.status_code >= 400:
+            raise CommandError(
+                f"{method} {url}: ответ {response.status_code}.",
+            )
+        return recorder.queries
+
+    def compare_snapshot(self, path, snapshot):
+        if not os.path.exists(path):
+            return [f"Нет снимка SQL {path}, запустите с --update."]
+        with open(path, encoding="utf-8") as file:
+            expected = file.read()
+        if expected == snapshot:
+            return []
+        diff = difflib.unified_diff(
+            expected.splitlines(), snapshot.splitlines(),
+            "снимок", "сейчас", lineterm="",
+        )
+        return ["SQL запросов отличается от снимка:", *diff]
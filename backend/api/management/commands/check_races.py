@@ -0,0 +1,174 @@
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from api.management.commands.benchmark import get_host
+from recipes.cache_tags import TAG_KEY, membership_tag
+from recipes.counters import COUNTERS
+from recipes.management.commands.seed_benchmark import IMAGE
+from recipes.models import (AmountIngredient, Cart, Favorite, Ingredient,
+                            Recipe, ShoppingListItem)
+from recipes.shopping_list import rebuild
+from users.models import CustomUser, Subscription
+
+# Адрес и ожидаемые статусы одновременных запросов: успешным должен
+# быть ровно один, остальные - повторы с ответом 400.
+ACTIONS = {
+    Favorite: "api:recipes-favorite",
+    Cart: "api:recipes-shopping-cart",
+    Subscription: "api:users-subscribe",
+}
+STATUSES = {"POST": 201, "DELETE": 204}
+
+
+def create_fixture(prefix):
+    """Читатель и автор с рецептом, которые проверка удалит."""
+    reader, author = CustomUser.objects.bulk_create(
+        CustomUser(username=f"{prefix}_{role}",
+                   email=f"{prefix}_{role}@example.com")
+        for role in ("reader", "author")
+    )
+    image = Recipe._meta.get_field("image")
+    image_name = image.storage.save(
+        f"{image.upload_to}{prefix}.png", ContentFile(IMAGE),
+    )
+    recipe = Recipe.objects.create(
+        author=author, name=prefix, text="text", image=image_name,
+        cooking_time=10,
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f"{prefix}_{number}", measurement_unit="г")
+        for number in range(3)
+    )
+    AmountIngredient.objects.bulk_create(
+        AmountIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for ingredient in ingredients
+    )
+    return reader, author, recipe
+
+
+def delete_fixture(reader, author, recipe):
+    """Удаляет тестовые данные вместе с изображением рецепта."""
+    recipe.image.storage.delete(recipe.image.name)
+    CustomUser.objects.filter(pk__in=(reader.pk, author.pk)).delete()
+    Ingredient.objects.filter(name__startswith=f"{recipe.name}_").delete()
+    cache.delete(TAG_KEY.format(tag=membership_tag(reader.pk)))
+
+
+class Command(BaseCommand):
+    """Проверка одновременных запросов к избранному, корзине и подпискам.
+
+    Потоки одновременно отправляют один и тот же запрос на добавление,
+    затем на удаление записи одного читателя для одного рецепта или
+    автора. Успешным должен быть ровно один запрос, остальные получают
+    400, запись должна остаться одна, счетчик - совпадать с числом
+    записей, а список покупок - с пересчитанным по корзине. Гонки
+    воспроизводятся на PostgreSQL, SQLite выполняет записи по одной.
+    Транзакцию между потоками не откатить, поэтому тестовые данные
+    создаются и удаляются командой.
+    """
+
+    help = "Проверяет избранное, корзину и подписки под одновременными " \
+           "запросами."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=8,
+            help="Число одновременных запросов.",
+        )
+        parser.add_argument(
+            "--rounds", type=int, default=5,
+            help="Сколько раз повторить добавление и удаление.",
+        )
+
+    def handle(self, *args, **options):
+        self.threads = options["threads"]
+        reader, author, recipe = create_fixture(
+            f"check_races_{uuid.uuid4().hex[:8]}",
+        )
+        token = Token.objects.create(user=reader)
+        self.headers = {
+            "HTTP_HOST": get_host(),
+            "HTTP_AUTHORIZATION": f"Token {token.key}",
+        }
+        errors = []
+        try:
+            for _ in range(options["rounds"]):
+                for model, name in ACTIONS.items():
+                    target = author if model is Subscription else recipe
+                    url = reverse(name, args=(target.pk,))
+                    for method, rows in (("POST", 1), ("DELETE", 0)):
+                        errors += self.check_action(
+                            model, reader, target, method, url, rows,
+                        )
+        finally:
+            delete_fixture(reader, author, recipe)
+        if errors:
+            raise CommandError("\n".join(dict.fromkeys(errors)))
+        self.stdout.write(self.style.SUCCESS("Гонок не найдено."))
+
+    def check_action(self, model, reader, target, method, url, rows):
+        """Одновременные запросы method и состояние данных после них."""
+        name = f"{method} {model.__name__}"
+        errors = []
+        statuses = self.send_parallel(method, url)
+        expected = sorted([STATUSES[method]] + [400] * (self.threads - 1))
+        if statuses != expected:
+            errors.append(f"{name}: статусы {statuses}")
+        counter_model, field, relation = COUNTERS[model]
+        count = model.objects.filter(
+            user=reader, **{relation: target},
+        ).count()
+        counter = counter_model.objects.values_list(
+            field, flat=True,
+        ).get(pk=target.pk)
+        if count != rows:
+            errors.append(f"{name}: записей {count}, ожидалось {rows}")
+        if counter != count:
+            errors.append(f"{name}: счетчик {counter}, записей {count}")
+        if model is Cart and not self.is_list_consistent(reader):
+            errors.append(f"{name}: список покупок расходится с корзиной")
+        return errors
+
+    def send_parallel(self, method, url):
+        """Отправляет запрос из всех потоков одновременно.
+
+        У каждого потока свое соединение с базой, оно закрывается
+        по завершении потока.
+        """
+        barrier = threading.Barrier(self.threads)
+        statuses = []
+
+        def send():
+            client = Client(raise_request_exception=False, **self.headers)
+            try:
+                barrier.wait()
+                statuses.append(client.generic(method, url).status_code)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=send) for _ in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(statuses)
+
+    def is_list_consistent(self, reader):
+        """Совпадает ли список покупок с пересчитанным по корзине."""
+        items = ShoppingListItem.objects.filter(user=reader).order_by(
+            "ingredient_id",
+        )
+        fields = ("ingredient_id", "amount", "recipes_count")
+        current = list(items.values_list(*fields))
+        rebuild((reader.pk,))
+        return current == list(items.values_list(*fields))
@@ -0,0 +1,94 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management import BaseCommand, CommandError
+
+PATHS = (
+    "/api/recipes/",
+    "/api/recipes/?limit=6&page=2",
+    "/api/tags/",
+    "/api/ingredients/?name=мол",
+)
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    """Нагрузочный тест API параллельными клиентами.
+
+    Запросы отправляются по кругу по списку адресов. Для сравнения
+    синхронного и асинхронного режимов команда запускается против
+    двух серверов на одних и тех же данных.
+    """
+
+    help = "Измеряет пропускную способность и задержки API."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Адрес запроса, можно указать несколько раз.",
+        )
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--token", help="Токен пользователя.")
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or PATHS
+        headers = {"Accept": "application/json"}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        total = options["requests"]
+        counter = iter(range(total))
+        lock = threading.Lock()
+        latencies = []
+        errors = []
+
+        def worker():
+            while True:
+                with lock:
+                    number = next(counter, None)
+                if number is None:
+                    return
+                request = Request(
+                    options["url"] + paths[number % len(paths)],
+                    headers=headers,
+                )
+                started = time.perf_counter()
+                try:
+                    with urlopen(request, timeout=options["timeout"]) as resp:
+                        resp.read()
+                except (HTTPError, URLError, OSError) as error:
+                    with lock:
+                        errors.append(error)
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            for _ in range(options["concurrency"]):
+                pool.submit(worker)
+        elapsed = time.perf_counter() - started
+        if not latencies:
+            raise CommandError(f"Все запросы завершились ошибкой: {errors[0]}")
+        latencies.sort()
+        self.stdout.write(
+            f"Запросов: {total}, ошибок: {len(errors)}, "
+            f"клиентов: {options['concurrency']}\n"
+            f"Пропускная способность: {len(latencies) / elapsed:.1f} rps\n"
+            f"Задержка, мс: среднее "
+            f"{statistics.mean(latencies) * 1000:.1f}, "
+            f"p50 {percentile(latencies, 0.5) * 1000:.1f}, "
+            f"p95 {percentile(latencies, 0.95) * 1000:.1f}, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.1f}",
+        )
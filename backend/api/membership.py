@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.cache_tags import bump_tags, get_tag_versions, membership_tag
+from recipes.models import Cart, Favorite
+from users.models import Subscription
+
+CACHE_KEY = "membership:{user_id}:{version}"
+
+MEMBERSHIP_FIELDS = {
+    Favorite: ("favorites", "recipe_id"),
+    Cart: ("cart", "recipe_id"),
+    Subscription: ("subscriptions", "author_id"),
+}
+
+
+class Membership:
+    """Связи пользователя: избранное, корзина и подписки.
+
+    Хранит множества id рецептов в избранном и в корзине
+    и id авторов, на которых подписан пользователь.
+    """
+
+    def __init__(self, favorites=(), cart=(), subscriptions=()):
+        self.favorites = set(favorites)
+        self.cart = set(cart)
+        self.subscriptions = set(subscriptions)
+
+
+def load_membership(user):
+    """Связи пользователя из кеша или из базы данных.
+
+    Ключ кеша содержит версию тега membership_tag пользователя.
+    Изменение связей меняет версию, поэтому данные, прочитанные
+    из базы до изменения и записанные в кеш после него, попадают
+    под старый ключ и больше не читаются.
+    """
+    tag = membership_tag(user.id)
+    key = CACHE_KEY.format(
+        user_id=user.id, version=get_tag_versions((tag,))[tag],
+    )
+    data = cache.get(key)
+    if data is None:
+        data = {
+            field: list(
+                model.objects.filter(user=user).values_list(
+                    value, flat=True,
+                ),
+            )
+            for model, (field, value) in MEMBERSHIP_FIELDS.items()
+        }
+        cache.set(key, data, settings.MEMBERSHIP_CACHE_TIMEOUT)
+    return Membership(**data)
+
+
+def get_membership(request):
+    """Связи текущего пользователя, загружаемые один раз за запрос."""
+    membership = getattr(request, "_membership", None)
+    if membership is None:
+        if request.user.is_authenticated:
+            membership = load_membership(request.user)
+        else:
+            membership = Membership()
+        request._membership = membership
+    return membership
+
+
+def invalidate_membership(user_id):
+    """Делает устаревшими закешированные связи пользователя."""
+    bump_tags(membership_tag(user_id))
+
+
+def change_ids(membership, model, object_ids, added):
+    ids = getattr(membership, MEMBERSHIP_FIELDS[model][0])
+    if added:
+        ids.update(object_ids)
+    else:
+        ids.difference_update(object_ids)
+
+
+def update_membership(request, model, object_id, added):
+    """Обновляет связи пользователя после добавления или удаления."""
+    update_membership_many(request, model, (object_id,), added)
+
+
+def update_membership_many(request, model, object_ids, added):
+    """Обновляет связи пользователя после изменения нескольких объектов.
+
+    Изменение записывается в связи текущего запроса, а закешированные
+    связи становятся устаревшими и при следующем обращении загружаются
+    из базы. Кеш не дописывается на месте: одновременные запросы
+    пользователя затирали бы изменения друг друга.
+    """
+    membership = getattr(request, "_membership", None)
+    if membership is not None:
+        change_ids(membership, model, object_ids, added)
+    invalidate_membership(request.user.id)
@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Представление выполнило больше запросов к базе, чем разрешено."""
+
+
+class RequestMetrics:
+    """Показатели одного запроса к API."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+
+    def server_timing(self, duration):
+        """Значение заголовка Server-Timing, время в миллисекундах."""
+        return ", ".join((
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f"serialize;dur={self.serialize_time * 1000:.1f}",
+            f"total;dur={duration * 1000:.1f}",
+        ))
+
+
+class ViewStats:
+    """Накопленные показатели одного представления."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.budget_exceeded = 0
+        self.duration = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.queries = 0
+        self.max_queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+    def observe(self, status_code, metrics, duration):
+        self.requests += 1
+        self.errors += status_code >= 500
+        self.duration += duration
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                self.buckets[index] += 1
+        self.queries += metrics.queries
+        self.max_queries = max(self.max_queries, metrics.queries)
+        self.db_time += metrics.db_time
+        self.serialize_time += metrics.serialize_time
+
+
+def escape_label(value):
+    return (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+class MetricsRegistry:
+    """Показатели запросов по представлениям в памяти процесса."""
+
+    counters = (
+        ("requests_total", "requests", "counter",
+         "Количество запросов."),
+        ("request_errors_total", "errors", "counter",
+         "Количество ответов с кодом 5xx."),
+        ("query_budget_exceeded_total", "budget_exceeded", "counter",
+         "Количество запросов сверх лимита запросов к базе."),
+        ("db_queries_total", "queries", "counter",
+         "Количество запросов к базе."),
+        ("db_queries_max", "max_queries", "gauge",
+         "Наибольшее число запросов к базе за один запрос."),
+        ("db_duration_seconds_total", "db_time", "counter",
+         "Время запросов к базе."),
+        ("serialize_duration_seconds_total", "serialize_time", "counter",
+         "Время сериализации ответов."),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, method, status_code, metrics, duration):
+        with self._lock:
+            stats = self._views.setdefault((view, method), ViewStats())
+            stats.observe(status_code, metrics, duration)
+
+    def budget_exceeded(self, view, method):
+        with self._lock:
+            self._views[view, method].budget_exceeded += 1
+
+    def render(self):
+        """Показатели в текстовом формате Prometheus."""
+        with self._lock:
+            views = sorted(
+                (
+                    f'view="{escape_label(view)}",method="{method}"',
+                    dict(vars(stats), buckets=list(stats.buckets)),
+                )
+                for (view, method), stats in self._views.items()
+            )
+        lines = []
+        for name, field, metric_type, description in self.counters:
+            lines.append(f"# HELP foodgram_{name} {description}")
+            lines.append(f"# TYPE foodgram_{name} {metric_type}")
+            for labels, stats in views:
+                lines.append(f"foodgram_{name}{{{labels}}} {stats[field]}")
+        name = "foodgram_request_duration_seconds"
+        lines.append(f"# HELP {name} Время обработки запроса.")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, stats in views:
+            for bound, count in zip(DURATION_BUCKETS, stats["buckets"]):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(
+                f'{name}_bucket{{{labels},le="+Inf"}} {stats["requests"]}',
+            )
+            lines.append(f"{name}_sum{{{labels}}} {stats['duration']}")
+            lines.append(f"{name}_count{{{labels}}} {stats['requests']}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка execute_wrapper: время и число запросов к базе."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(connection):
+    """Подключает record_query к соединению с базой."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def measure_serialization():
+    """Учитывает время сериализации в показателях текущего запроса.
+
+    Вложенные сериализаторы не учитываются повторно.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialize_time += time.perf_counter() - started
+        metrics.serializing = False
+
+
+@contextmanager
+def track_request():
+    """Собирает показатели запроса внутри блока."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def get_view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else "unmatched"
+
+
+def check_query_budget(view, method, metrics):
+    """Проверка лимита запросов к базе из QUERY_BUDGETS.
+
+    Лимиты задаются для пар "метод имя представления".
+    При превышении записывает предупреждение, а при
+    QUERY_BUDGET_ACTION = "raise" вызывает QueryBudgetExceeded.
+    """
+    budget = settings.QUERY_BUDGETS.get(f"{method} {view}")
+    if budget is None or metrics.queries <= budget:
+        return
+    registry.budget_exceeded(view, method)
+    message = (
+        f"{method} {view}: {metrics.queries} запросов к базе "
+        f"при лимите {budget}"
+    )
+    if settings.QUERY_BUDGET_ACTION == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def record_request(request, response, metrics):
+    """Сохраняет показатели запроса и добавляет Server-Timing.
+
+    Запросы к базе при отдаче потоковых ответов, например файла
+    со списком покупок, выполняются позже и не учитываются.
+    """
+    duration = time.perf_counter() - metrics.started
+    view = get_view_name(request)
+    registry.observe(
+        view, request.method, response.status_code, metrics, duration,
+    )
+    if settings.SERVER_TIMING:
+        response["Server-Timing"] = metrics.server_timing(duration)
+    check_query_budget(view, request.method, metrics)
+    return response
@@ -1,10 +1,136 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from foodgram.settings import PAGE_SIZE
 
 
+def get_estimated_count(queryset):
+    """Оценка количества строк по статистике pg_class.reltuples.
+
+    Оценка возможна только для запроса без условий в PostgreSQL,
+    в остальных случаях выполняется точный подсчет.
+    """
+    if connection.vendor != "postgresql" or queryset.query.where:
+        return queryset.count()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if not row or row[0] <= 0:
+        return queryset.count()
+    return row[0]
+
+
 class LimitPageNumberPagination(PageNumberPagination):
-    """Пагинация."""
+    """Пагинация.
+
+    По умолчанию постраничная. Если представление задает
+    cursor_ordering и в запросе передан параметр cursor, страницы
+    выбираются по ключу сортировки без OFFSET. Количество объектов
+    в этом режиме считается только по запросу: count=exact
+    или count=estimate.
+    """
 
     page_size = PAGE_SIZE
     page_size_query_param = "limit"
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, "cursor_ordering", None)
+        self.cursor_mode = bool(
+            ordering and self.cursor_query_param in request.query_params,
+        )
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.ordering = ordering
+        page_size = self.get_page_size(request)
+        page = queryset.order_by(*ordering)
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            page = page.filter(self.get_cursor_filter(queryset.model, cursor))
+        page = list(page[:page_size + 1])
+        self.next_position = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_position = self.encode_cursor(page[-1])
+        self.count = self.get_count(queryset, request)
+        return page
+
+    def get_count(self, queryset, request):
+        count = request.query_params.get(self.count_query_param)
+        if count == "exact":
+            return queryset.count()
+        if count == "estimate":
+            return get_estimated_count(queryset)
+        return None
+
+    def encode_cursor(self, obj):
+        """Значения полей сортировки объекта в виде строки курсора."""
+        values = [
+            obj._meta.get_field(field.lstrip("-")).value_to_string(obj)
+            for field in self.ordering
+        ]
+        return base64.urlsafe_b64encode(
+            json.dumps(values).encode(),
+        ).decode()
+
+    def get_cursor_filter(self, model, cursor):
+        """Условие выборки объектов, идущих после курсора.
+
+        Для сортировки (a, b) это a < x OR (a = x AND b < y)
+        с учетом направления каждого поля.
+        """
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            values = [
+                model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_position,
+        )
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ("count", self.count),
+            ("next", self.get_next_link()),
+            ("previous", None),
+            ("results", data),
+        ]))
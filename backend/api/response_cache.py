@@ -0,0 +1,132 @@
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from recipes.cache_tags import get_tag_versions
+
+CACHE_KEY = "response_cache:{digest}"
+
+
+def get_cache_key(request):
+    """Ключ кеша по пути и нормализованной строке запроса."""
+    params = sorted(
+        (key, value)
+        for key in request.query_params
+        for value in request.query_params.getlist(key)
+    )
+    raw = "|".join((
+        request.path,
+        urlencode(params),
+        request.accepted_renderer.format,
+    ))
+    return CACHE_KEY.format(digest=hashlib.md5(raw.encode()).hexdigest())
+
+
+def etag_matches(request, etag):
+    """Совпадает ли ETag с одним из переданных в If-None-Match."""
+    if_none_match = request.headers.get("If-None-Match", "")
+    return etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+def is_not_modified(request, etag, last_modified):
+    """Проверка условного запроса If-None-Match / If-Modified-Since."""
+    if request.headers.get("If-None-Match"):
+        return etag_matches(request, etag)
+    if_modified_since = parse_http_date_safe(
+        request.headers.get("If-Modified-Since", ""),
+    )
+    return (
+        if_modified_since is not None
+        and int(last_modified) <= if_modified_since
+    )
+
+
+def build_response(request, entry):
+    """Ответ из записи кеша или 304, если у клиента актуальная копия."""
+    if is_not_modified(request, entry["etag"], entry["last_modified"]):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(
+            entry["content"], content_type=entry["content_type"],
+        )
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    patch_vary_headers(response, ("Authorization",))
+    return response
+
+
+def cache_public_response(*tags):
+    """Кеширует ответы анонимным пользователям.
+
+    Запись кеша зависит от тегов: переданных в декоратор и
+    возвращенных методом представления get_response_cache_tags
+    по данным ответа. Запись считается актуальной, пока версии
+    всех ее тегов не изменились. Ответы содержат ETag и
+    Last-Modified, на условные запросы возвращается 304.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if (request.user.is_authenticated
+                    or request.accepted_renderer.format != "json"):
+                return method(view, request, *args, **kwargs)
+            key = get_cache_key(request)
+            entry = cache.get(key)
+            if entry and get_tag_versions(entry["tags"]) == entry["tags"]:
+                return build_response(request, entry)
+            versions = get_tag_versions(tags)
+            response = method(view, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = view.get_renderer_context()
+            response.render()
+            get_tags = getattr(view, "get_response_cache_tags", None)
+            if get_tags is not None:
+                versions.update(get_tag_versions(get_tags(response.data)))
+            entry = {
+                "content": response.content,
+                "content_type": response["Content-Type"],
+                "etag": '"{}"'.format(
+                    hashlib.md5(response.content).hexdigest(),
+                ),
+                "last_modified": time.time(),
+                "tags": versions,
+            }
+            cache.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+            return build_response(request, entry)
+
+        return wrapper
+
+    return decorator
+
+
+def etag_precondition(method):
+    """Отвечает 304 до сериализации, если ETag клиента актуален.
+
+    ETag вычисляется методом представления get_etag. Если он вернул
+    None, запрос обрабатывается как обычно.
+    """
+
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        etag = view.get_etag(request, *args, **kwargs)
+        if etag is not None and etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = method(view, request, *args, **kwargs)
+        if etag is not None and response.status_code in (200, 304):
+            response["ETag"] = etag
+            patch_vary_headers(response, ("Authorization",))
+        return response
+
+    return wrapper
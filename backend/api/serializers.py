@@ -1,28 +1,65 @@
 import base64
+import binascii
+import uuid
 
-from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers, validators
 
-from recipes.models import (AmountIngredient, Cart, Favorite, Ingredient,
-                            Recipe, Tag)
+from api.membership import get_membership
+from api.metrics import measure_serialization
+from recipes.images import schedule_image_processing
+from recipes.models import AmountIngredient, Ingredient, Recipe, Tag
+from recipes.search import update_search_index
+from recipes.shopping_list import (change_recipe_lists, lock_recipes,
+                                   remove_empty)
 from users.models import CustomUser, Subscription
 
 
 class Base64ImageField(serializers.ImageField):
     """Кастомное поле для декодирования изображений
     из формата base64 в формат изображения.
+
+    Данные декодируются частями во временный файл, поэтому
+    декодированная копия целиком в памяти не хранится.
     """
 
+    chunk_size = 64 * 1024
+
+    def decode(self, imgstr, name, content_type):
+        file = TemporaryUploadedFile(name, content_type, 0, None)
+        try:
+            for start in range(0, len(imgstr), self.chunk_size):
+                file.write(base64.b64decode(
+                    imgstr[start:start + self.chunk_size], validate=True,
+                ))
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail("invalid_image")
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
             format, imgstr = data.split(";base64,")
             ext = format.split("/")[-1]
-            data = ContentFile(base64.b64decode(imgstr), name="temp." + ext)
+            data = self.decode(
+                imgstr, f"{uuid.uuid4().hex}.{ext}", format[len("data:"):],
+            )
         return super().to_internal_value(data)
 
 
-class UserSerializer(UserCreateSerializer):
+class TimedSerializerMixin:
+    """Учитывает время сериализации в показателях запроса."""
+
+    def to_representation(self, instance):
+        with measure_serialization():
+            return super().to_representation(instance)
+
+
+class UserSerializer(TimedSerializerMixin, UserCreateSerializer):
     """Сериализатор для работы с пользователями."""
     is_subscribed = serializers.SerializerMethodField()
 
@@ -33,8 +70,8 @@ class UserSerializer(UserCreateSerializer):
 
     def get_is_subscribed(self, obj):
         """Проверка подписки."""
-        return Subscription.objects.filter(user=obj,
-                                           author=obj).exists()
+        request = self.context.get("request")
+        return obj.id in get_membership(request).subscriptions
 
 
 class UserPasswordSerializer(serializers.Serializer):
@@ -65,7 +102,17 @@ class UserPasswordSerializer(serializers.Serializer):
         return user
 
 
-class TagSerializer(serializers.ModelSerializer):
+class IdListSerializer(serializers.Serializer):
+    """Сериализатор списка id для пакетных операций."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для тега."""
 
     class Meta:
@@ -73,7 +120,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для ингредиентов."""
 
     class Meta:
@@ -97,7 +144,32 @@ class AmountIngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
-class FavoriteOrSubscribeSerializer(serializers.ModelSerializer):
+class AmountIngredientCreateSerializer(AmountIngredientSerializer):
+    """Ингредиент рецепта при создании и изменении.
+
+    Существование ингредиентов проверяет одним запросом
+    RecipeCreateSerializer.validate_ingredients.
+    """
+
+    id = serializers.IntegerField()
+
+
+class ShoppingListItemSerializer(
+    TimedSerializerMixin, serializers.Serializer,
+):
+    """Сериализатор строки списка покупок из get_shopping_list."""
+
+    id = serializers.IntegerField(source="ingredient_id")
+    name = serializers.CharField(source="ingredient__name")
+    measurement_unit = serializers.CharField(
+        source="ingredient__measurement_unit",
+    )
+    amount = serializers.IntegerField(source="total_amount")
+
+
+class FavoriteOrSubscribeSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer,
+):
     """Сериализатор для отображения рецептов
     в списке избранного или подписок."""
 
@@ -109,7 +181,23 @@ class FavoriteOrSubscribeSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "name", "image", "cooking_time")
 
 
-class SubscribeSerializer(serializers.ModelSerializer):
+def get_recipes_limit(query_params):
+    """Параметр recipes_limit: None, если не задан, или целое >= 0."""
+    value = query_params.get("recipes_limit")
+    if value is None or value == "":
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise serializers.ValidationError(
+            {"recipes_limit": "Укажите целое неотрицательное число."},
+        )
+    return value
+
+
+class SubscribeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для подписок."""
 
     id = serializers.IntegerField(source="author.id")
@@ -143,23 +231,27 @@ class SubscribeSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         """Проверка подписки."""
-        user = self.context.get('request').user
-        return Subscription.objects.filter(user=user,
-                                           author=obj.author).exists()
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
+        request = self.context.get("request")
+        return obj.author_id in get_membership(request).subscriptions
 
     def get_recipes(self, obj):
         """Получить рецепты автора."""
-        request = self.context.get('request')
-        recipes_limit = request.GET.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=obj.author)
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
+        if hasattr(obj, "author_recipes"):
+            recipes = obj.author_recipes
+        else:
+            request = self.context.get('request')
+            recipes_limit = get_recipes_limit(request.GET)
+            recipes = Recipe.objects.filter(author=obj.author)
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         serializer = FavoriteOrSubscribeSerializer(recipes, many=True)
         return serializer.data
 
     def get_recipes_count(self, obj):
-        """Подсчет рецептов автора."""
-        return Recipe.objects.filter(author=obj.author).count()
+        """Количество рецептов автора."""
+        return obj.author.recipes_count
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -171,13 +263,34 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
     author = UserSerializer(read_only=True)
     cooking_time = serializers.IntegerField()
-    ingredients = AmountIngredientSerializer(many=True)
+    ingredients = AmountIngredientCreateSerializer(many=True)
 
     class Meta:
         model = Recipe
         fields = ("id", "author", "name", "image", "text", "ingredients",
                   "tags", "cooking_time", )
 
+    def validate_ingredients(self, ingredients):
+        """Заменяет id ингредиентов объектами, выбранными одним запросом."""
+        found = Ingredient.objects.in_bulk(
+            {ingredient["id"] for ingredient in ingredients},
+        )
+        message = serializers.PrimaryKeyRelatedField.default_error_messages[
+            "does_not_exist"
+        ]
+        errors = [
+            {} if ingredient["id"] in found else {
+                "id": [message.format(pk_value=ingredient["id"])],
+            }
+            for ingredient in ingredients
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return [
+            {**ingredient, "id": found[ingredient["id"]]}
+            for ingredient in ingredients
+        ]
+
     def create_ingredients(self, recipe, ingredients):
         """Создание ингредиентов в промежуточной таблице."""
         amount_ingredients = []
@@ -197,19 +310,65 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ingredients = validated_data.pop("ingredients")
         tags = validated_data.pop("tags")
         recipe = Recipe.objects.create(image=image, **validated_data)
+        image.close()
         recipe.tags.set(tags)
         self.create_ingredients(recipe, ingredients)
+        update_search_index(recipe)
+        schedule_image_processing(recipe)
         return recipe
 
+    def update_ingredients(self, recipe, ingredients):
+        """Обновление ингредиентов по разнице с сохраненными.
+
+        Меняется количество у оставшихся ингредиентов, добавляются
+        только новые и удаляются только убранные из рецепта. Если
+        ингредиенты изменились, списки покупок пользователей с рецептом
+        в корзине пересчитываются по разнице старых и новых количеств
+        под блокировкой рецепта, чтобы одновременное добавление рецепта
+        в корзину не учло старые количества после вычитания.
+        """
+        new_ingredients = {
+            ingredient["id"].id: ingredient for ingredient in ingredients
+        }
+        changed = []
+        removed = []
+        for amount_ingredient in recipe.amount_recipe.all():
+            ingredient = new_ingredients.pop(
+                amount_ingredient.ingredient_id, None,
+            )
+            if ingredient is None:
+                removed.append(amount_ingredient.id)
+            elif ingredient["amount"] != amount_ingredient.amount:
+                amount_ingredient.amount = ingredient["amount"]
+                changed.append(amount_ingredient)
+        if not (removed or changed or new_ingredients):
+            return
+        lock_recipes((recipe.id,), exclusive=True)
+        change_recipe_lists(recipe.id, -1)
+        if removed:
+            AmountIngredient.objects.filter(id__in=removed).delete()
+        if changed:
+            AmountIngredient.objects.bulk_update(changed, ("amount",))
+        self.create_ingredients(recipe, new_ingredients.values())
+        change_recipe_lists(recipe.id, 1)
+        remove_empty(recipe.id)
+
     def update(self, obj, validated_data):
-        """Обновление рецепта."""
-        obj.tags.clear()
-        obj.tags.set(validated_data.pop("tags"))
-        AmountIngredient.objects.filter(recipe=obj).delete()
-        self.create_ingredients(
-            recipe=obj, ingredients=validated_data.pop("ingredients"),
-        )
-        super().update(obj, validated_data)
+        """Обновление рецепта.
+
+        Изображение обрабатывается заново, только если изменилось
+        его содержимое: одинаковые файлы хранилище сохраняет под
+        одним именем.
+        """
+        image_name = obj.image.name
+        with transaction.atomic():
+            obj.tags.set(validated_data.pop("tags"))
+            self.update_ingredients(obj, validated_data.pop("ingredients"))
+            super().update(obj, validated_data)
+        if "image" in validated_data:
+            validated_data["image"].close()
+            if obj.image.name != image_name:
+                schedule_image_processing(obj)
         return obj
 
     def validate(self, data):
@@ -222,39 +381,51 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return data
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор отображения рецепта."""
 
     tags = TagSerializer(many=True)
     image = Base64ImageField()
     author = UserSerializer(read_only=True)
     cooking_time = serializers.IntegerField()
+    image_renditions = serializers.SerializerMethodField()
     ingredients = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ("id", "author", "name", "image", "text", "ingredients",
-                  "tags", "cooking_time", "is_favorited", "is_in_cart",)
+        fields = ("id", "author", "name", "image", "image_renditions", "text",
+                  "ingredients", "tags", "cooking_time", "is_favorited",
+                  "is_in_cart",)
+
+    def get_image_renditions(self, obj):
+        """Адреса уменьшенных копий изображения, если они готовы."""
+        renditions = obj.image_renditions
+        if renditions.get("source") != obj.image.name:
+            return {}
+        request = self.context.get("request")
+        storage = obj.image.storage
+        return {
+            size: {
+                image_format: request.build_absolute_uri(storage.url(path))
+                for image_format, path in formats.items()
+            }
+            for size, formats in renditions["sizes"].items()
+        }
 
     def get_ingredients(self, obj):
         """Получение ингредиентов."""
-        ingredients = AmountIngredient.objects.filter(recipe=obj)
-        return AmountIngredientSerializer(ingredients, many=True).data
+        return AmountIngredientSerializer(
+            obj.amount_recipe.all(), many=True,
+        ).data
 
     def get_is_favorited(self, obj):
         """Проверка рецепта в списке избранного."""
-        user = self.context.get("request").user
-        return (
-            user.is_authenticated
-            and Favorite.objects.filter(user=user, recipe=obj).exists()
-        )
+        request = self.context.get("request")
+        return obj.id in get_membership(request).favorites
 
     def get_is_in_cart(self, obj):
         """Проверка рецепта в корзине покупок."""
-        user = self.context.get("request").user
-        return (
-            user.is_authenticated
-            and Cart.objects.filter(user=user, recipe=obj).exists()
-        )
+        request = self.context.get("request")
+        return obj.id in get_membership(request).cart
@@ -0,0 +1,114 @@
+import csv
+import io
+import os
+
+from django.conf import settings
+from django.db.models import F
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.models import ShoppingListItem
+
+CHUNK_SIZE = 64 * 1024
+PDF_FONT_NAME = "ShoppingListFont"
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 18
+
+
+def get_shopping_list(user):
+    """Суммарное количество ингредиентов из корзины пользователя.
+
+    Суммы хранятся в ShoppingListItem и обновляются при изменении
+    корзины, поэтому список читается по индексу без агрегации.
+    Ингредиент задает единицу измерения, поэтому разные единицы
+    одного продукта не складываются между собой.
+    """
+    return (
+        ShoppingListItem.objects.filter(user=user)
+        .values(
+            "ingredient_id", "ingredient__name",
+            "ingredient__measurement_unit", total_amount=F("amount"),
+        )
+        .order_by("ingredient__name", "ingredient__measurement_unit")
+    )
+
+
+def format_item(item):
+    """Строка списка покупок для одного ингредиента."""
+    return (
+        f'{item["ingredient__name"]} '
+        f'({item["ingredient__measurement_unit"]}) - '
+        f'{item["total_amount"]}'
+    )
+
+
+class Echo:
+    """Псевдобуфер, возвращающий записанную строку для csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def render_txt(items):
+    """Список покупок в виде текстового файла."""
+    for item in items:
+        yield f"{format_item(item)}\n"
+
+
+def render_csv(items):
+    """Список покупок в формате CSV."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(("Ингредиент", "Единица измерения", "Количество"))
+    for item in items:
+        yield writer.writerow(
+            (
+                item["ingredient__name"],
+                item["ingredient__measurement_unit"],
+                item["total_amount"],
+            ),
+        )
+
+
+def get_pdf_font():
+    """Шрифт с поддержкой кириллицы, если он доступен в системе."""
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    if not os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+        return "Helvetica"
+    pdfmetrics.registerFont(
+        TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT),
+    )
+    return PDF_FONT_NAME
+
+
+def render_pdf(items):
+    """Список покупок в формате PDF.
+
+    Документ собирается постранично и отдается частями по CHUNK_SIZE.
+    """
+    buffer = io.BytesIO()
+    font = get_pdf_font()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    pdf.setFont(font, PDF_FONT_SIZE)
+    y = height - PDF_MARGIN
+    for item in items:
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(font, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        pdf.drawString(PDF_MARGIN, y, format_item(item))
+        y -= PDF_LINE_HEIGHT
+    pdf.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(CHUNK_SIZE), b"")
+
+
+SHOPPING_LIST_FORMATS = {
+    "txt": ("text/plain; charset=utf-8", render_txt),
+    "csv": ("text/csv; charset=utf-8", render_csv),
+    "pdf": ("application/pdf", render_pdf),
+}
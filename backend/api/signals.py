@@ -0,0 +1,74 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.metrics import install_query_recorder
+from recipes.cache_tags import (RECIPES_TAG, TAGS_TAG, USERS_TAG, author_tag,
+                                bump_tags, recipe_tag)
+from recipes.models import AmountIngredient, Ingredient, Recipe, Tag
+from users.models import CustomUser
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_saved_recipe(sender, instance, created, **kwargs):
+    """Сбрасывает кеш списков и страницы измененного рецепта.
+
+    Списки сбрасываются и при изменении рецепта: после смены
+    названия или описания он может попасть в результаты поиска
+    или фильтра, где его раньше не было.
+    """
+    bump_tags(RECIPES_TAG, recipe_tag(instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_deleted_recipe(sender, instance, **kwargs):
+    """Сбрасывает кеш списков и страницы удаленного рецепта."""
+    bump_tags(RECIPES_TAG, recipe_tag(instance.pk))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, **kwargs):
+    """Сбрасывает кеш рецепта и списков при смене его тегов."""
+    if action.startswith("post_") and isinstance(instance, Recipe):
+        bump_tags(RECIPES_TAG, recipe_tag(instance.pk))
+
+
+@receiver(post_save, sender=AmountIngredient)
+@receiver(post_delete, sender=AmountIngredient)
+def invalidate_recipe_ingredients(sender, instance, **kwargs):
+    """Сбрасывает кеш рецепта при смене его ингредиентов."""
+    bump_tags(recipe_tag(instance.recipe_id))
+
+
+@receiver(post_save, sender=Ingredient)
+def invalidate_ingredient_recipes(sender, instance, created, **kwargs):
+    """Сбрасывает кеш рецептов с переименованным ингредиентом."""
+    if created:
+        return
+    bump_tags(*(
+        recipe_tag(pk)
+        for pk in Recipe.objects.filter(
+            ingredients=instance,
+        ).values_list("pk", flat=True)
+    ))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    """Сбрасывает кеш ответов, содержащих теги."""
+    bump_tags(TAGS_TAG)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_author(sender, instance, update_fields=None, **kwargs):
+    """Сбрасывает кеш рецептов автора после изменения его данных."""
+    if update_fields and set(update_fields) <= {"last_login", "password"}:
+        return
+    bump_tags(author_tag(instance.pk), USERS_TAG)
+
+
+@receiver(connection_created)
+def record_connection_queries(sender, connection, **kwargs):
+    """Учитывает запросы соединения в показателях запросов к API."""
+    install_query_recorder(connection)
@@ -1,8 +1,9 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (IngredientViewSet, RecipeViewSet, TagViewSet,
-                       UpdatePasswordView, UserViewSet)
+                       UpdatePasswordView, UserViewSet, metrics)
 
 app_name = "api"
 
@@ -14,9 +15,31 @@ router_v1.register("ingredients", IngredientViewSet, basename="ingredients")
 router_v1.register("tags", TagViewSet, basename="tags")
 
 urlpatterns = [
+    path("metrics/", metrics, name="metrics"),
     path("", include(router_v1.urls)),
     path("", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken"), name="signup"),
     path("users/set_password/", UpdatePasswordView.as_view(),
          name="set_password"),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    from api import async_views
+
+    urlpatterns = [
+        path("tags/", async_views.tag_list, name="tags-list"),
+        path("tags/<int:pk>/", async_views.tag_detail, name="tags-detail"),
+        path(
+            "ingredients/", async_views.ingredient_list,
+            name="ingredients-list",
+        ),
+        path("recipes/", async_views.recipe_list, name="recipes-list"),
+        path(
+            "recipes/<int:pk>/", async_views.recipe_detail,
+            name="recipes-detail",
+        ),
+        path(
+            "users/subscriptions/", async_views.subscription_list,
+            name="users-subscriptions",
+        ),
+    ] + urlpatterns
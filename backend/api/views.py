@@ -1,4 +1,14 @@
-from django.http import HttpResponse
+import hashlib
+import hmac
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import (BooleanField, Count, F, Max, Prefetch, Value,
+                              Window)
+from django.db.models.functions import RowNumber
+from django.http import (Http404, HttpResponse, HttpResponseForbidden,
+                         StreamingHttpResponse)
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import filters, status, viewsets
@@ -11,17 +21,134 @@ from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
 from api.filters import IngredientFilter, RecipeFilter
+from api.membership import (get_membership, update_membership,
+                            update_membership_many)
+from api.metrics import registry
 from api.pagination import LimitPageNumberPagination
 from api.permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
-from api.serializers import (FavoriteOrSubscribeSerializer,
+from api.response_cache import cache_public_response, etag_precondition
+from api.serializers import (FavoriteOrSubscribeSerializer, IdListSerializer,
                              IngredientSerializer, RecipeCreateSerializer,
-                             RecipeSerializer, SubscribeSerializer,
-                             TagSerializer, UserPasswordSerializer,
-                             UserSerializer)
-from recipes.models import Cart, Favorite, Ingredient, Recipe, Tag
+                             RecipeSerializer, ShoppingListItemSerializer,
+                             SubscribeSerializer, TagSerializer,
+                             UserPasswordSerializer, UserSerializer,
+                             get_recipes_limit)
+from api.shopping_list import SHOPPING_LIST_FORMATS, get_shopping_list
+from recipes.cache_tags import (INGREDIENTS_TAG, RECIPES_TAG, TAGS_TAG,
+                                USERS_TAG, author_tag, bump_tags,
+                                get_tag_versions, recipe_tag)
+from recipes.cookable import cookable_index
+from recipes.counters import COUNTERS, change_counter, change_counters
+from recipes.ingredient_index import ingredient_index
+from recipes.links import delete_links, insert_links
+from recipes.models import (AmountIngredient, Cart, Favorite, Ingredient,
+                            Recipe, Tag)
+from recipes.shopping_list import change_user_list
 from users.models import CustomUser, Subscription
 
 
+def get_subscriptions(user):
+    """Подписки пользователя с авторами."""
+    return Subscription.objects.filter(user=user).select_related(
+        "author",
+    ).annotate(is_subscribed=Value(True, output_field=BooleanField()))
+
+
+def get_author_recipes(subscriptions, recipes_limit=None):
+    """Первые recipes_limit рецептов авторов подписок одним запросом."""
+    recipes = Recipe.objects.filter(
+        author__in=[subscription.author_id for subscription in subscriptions],
+    ).annotate(
+        row_number=Window(
+            RowNumber(),
+            partition_by=F("author"),
+            order_by=F("pub_date").desc(),
+        ),
+    )
+    if recipes_limit is not None:
+        recipes = recipes.filter(row_number__lte=recipes_limit)
+    return recipes
+
+
+def attach_author_recipes(subscriptions, recipes):
+    """Раскладывает рецепты по подпискам на их авторов."""
+    author_recipes = defaultdict(list)
+    for recipe in recipes:
+        author_recipes[recipe.author_id].append(recipe)
+    for subscription in subscriptions:
+        subscription.author_recipes = author_recipes[subscription.author_id]
+
+
+def change_links(request, model, exclude=()):
+    """Пакетное добавление или удаление записей model пользователя.
+
+    Id объектов передаются списком ids, существующие объекты
+    выбираются одним запросом. Записи вставляются или удаляются
+    одним запросом, который возвращает id действительно измененных
+    записей. Счетчики, списки покупок и связи пользователя меняются
+    только для них, поэтому одновременные запросы не учитывают одну
+    запись дважды. Возвращает статус для каждого id: added, removed,
+    unchanged, not_found или invalid для id из exclude.
+    """
+    serializer = IdListSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = list(dict.fromkeys(serializer.validated_data["ids"]))
+    target, _, relation = COUNTERS[model]
+    found = set(
+        target.objects.filter(pk__in=ids).values_list("pk", flat=True),
+    ).difference(exclude)
+    added = request.method == "POST"
+    change = insert_links if added else delete_links
+    changed = set()
+    if found:
+        with transaction.atomic():
+            changed = change(model, request.user, relation, found)
+            change_counters(model, changed, 1 if added else -1)
+            if model is Cart:
+                change_user_list(
+                    request.user.id, changed, 1 if added else -1,
+                )
+    if changed:
+        update_membership_many(request, model, changed, added)
+    return Response({"results": [
+        {"id": pk, "status": get_link_status(
+            pk, found, changed, exclude, added,
+        )}
+        for pk in ids
+    ]})
+
+
+def get_link_status(pk, found, changed, exclude, added):
+    if pk in exclude:
+        return "invalid"
+    if pk not in found:
+        return "not_found"
+    if pk in changed:
+        return "added" if added else "removed"
+    return "unchanged"
+
+
+def metrics(request):
+    """Показатели запросов к API в текстовом формате Prometheus.
+
+    METRICS_TOKEN передается заголовком Authorization: Bearer <токен>.
+    Без заданного токена адрес недоступен: nginx открывает /api/
+    в интернет, а показатели раскрывают задержки и запросы
+    представлений.
+    """
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    if not hmac.compare_digest(
+        request.headers.get("Authorization", ""),
+        f"Bearer {settings.METRICS_TOKEN}",
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 class UpdatePasswordView(APIView):
     """Обновление пароля пользователя"""
 
@@ -52,6 +179,7 @@ class UserViewSet(DjoserUserViewSet):
     filter_backends = (filters.SearchFilter,)
     search_fields = ("username", "email")
     permission_classes = (AllowAny,)
+    cursor_ordering = None
 
     @action(
         methods=["POST", "DELETE"],
@@ -59,48 +187,75 @@ class UserViewSet(DjoserUserViewSet):
         permission_classes=(IsAuthenticated,),
     )
     def subscribe(self, request, id):
-        """Подписаться или отписаться."""
-        author = get_object_or_404(CustomUser, id=id)
+        """Подписаться или отписаться.
+
+        Повторную подписку отсекает уникальное ограничение
+        unique_subscribing, поэтому одновременные запросы не
+        приводят к ошибке сервера. Отписка выполняется одним
+        запросом на удаление.
+        """
         if request.method == "POST":
+            author = get_object_or_404(CustomUser, id=id)
             if request.user.id == author.id:
                 raise ValidationError("Нельзя подписаться на себя самого")
-            existing_subscription = Subscription.objects.filter(
-                user=request.user, author=author
-            )
-            if existing_subscription.exists():
+            try:
+                with transaction.atomic():
+                    new_subscription = Subscription.objects.create(
+                        user=request.user, author=author,
+                    )
+                    change_counter(Subscription, author.id, 1)
+            except IntegrityError:
                 return Response(
                     "Вы уже подписаны на этого автора",
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            new_subscription = Subscription.objects.create(
-                user=request.user, author=author,
-            )
+            update_membership(request, Subscription, author.id, added=True)
             serializer = SubscribeSerializer(
                 new_subscription, context={"request": request},
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        if request.method == "DELETE":
-            existing_subscription = Subscription.objects.filter(
-                user=request.user, author=author,
-            )
-            if existing_subscription.exists():
-                existing_subscription.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            return Response(
-                "Нельзя отписаться от автора, на которого вы не подписаны",
-                status=status.HTTP_400_BAD_REQUEST,
+        with transaction.atomic():
+            deleted, _ = Subscription.objects.filter(
+                user=request.user, author_id=id,
+            ).delete()
+            if deleted:
+                change_counter(Subscription, id, -1)
+        if deleted:
+            update_membership(
+                request, Subscription, int(id), added=False,
             )
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(CustomUser, id=id)
+        return Response(
+            "Нельзя отписаться от автора, на которого вы не подписаны",
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(
+        methods=["POST", "DELETE"],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+    )
+    def bulk_subscribe(self, request):
+        """Подписаться на несколько авторов или отписаться от них."""
+        return change_links(request, Subscription, exclude={request.user.id})
 
     @action(
         methods=["GET"],
         detail=False,
         permission_classes=(IsAuthenticated,),
+        cursor_ordering=("-id",),
     )
     def subscriptions(self, request):
-        """Получить на кого пользователь подписан."""
-        page = self.paginate_queryset(
-            Subscription.objects.filter(user=request.user),
-        )
+        """Получить на кого пользователь подписан.
+
+        Количество рецептов берется из счетчика автора, а первые
+        recipes_limit рецептов всех авторов страницы выбираются
+        одним запросом с оконной функцией.
+        """
+        page = self.paginate_queryset(get_subscriptions(request.user))
+        recipes_limit = get_recipes_limit(request.query_params)
+        attach_author_recipes(page, get_author_recipes(page, recipes_limit))
         serializer = SubscribeSerializer(
             page, many=True, context={"request": request},
         )
@@ -115,6 +270,14 @@ class TagViewSet(ReadOnlyModelViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
 
+    @cache_public_response(TAGS_TAG)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_public_response(TAGS_TAG)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class IngredientViewSet(ReadOnlyModelViewSet):
     """Список ингредиентов."""
@@ -126,6 +289,16 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
 
+    @cache_public_response(INGREDIENTS_TAG)
+    def list(self, request, *args, **kwargs):
+        """Поиск ингредиентов по индексу в памяти без запросов к базе."""
+        name = request.query_params.get(IngredientFilter.search_param, "")
+        return Response(ingredient_index.search(name))
+
+    @cache_public_response(INGREDIENTS_TAG)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Список рецептов."""
@@ -135,34 +308,158 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrReadOnly,)
+    filtered_queryset = None
+
+    @property
+    def cursor_ordering(self):
+        """Сортировка для курсора в списке рецептов.
+
+        Параметры ordering и search задают свой порядок (оценки
+        и релевантность), поэтому с ними остается обычная
+        постраничная пагинация.
+        """
+        params = self.request.query_params
+        if (self.action != "list" or "ordering" in params
+                or params.get("search", "").strip()):
+            return None
+        return ("-pub_date", "-id")
+
+    def get_queryset(self):
+        """Рецепты со связанными данными.
+
+        Автор, теги и ингредиенты загружаются заранее, а признаки
+        избранного, корзины и подписки на автора берутся из связей
+        пользователя, поэтому число запросов не зависит от размера
+        страницы.
+        """
+        return Recipe.objects.select_related("author").prefetch_related(
+            "tags",
+            Prefetch(
+                "amount_recipe",
+                queryset=AmountIngredient.objects.select_related("ingredient"),
+            ),
+        )
+
+    def filter_queryset(self, queryset):
+        """Фильтрует рецепты один раз за запрос.
+
+        get_etag и обработчик запроса получают один и тот же
+        результат, поэтому запросы фильтров (варианты тегов, поиск)
+        не повторяются.
+        """
+        if self.filtered_queryset is None:
+            self.filtered_queryset = super().filter_queryset(queryset)
+        return self.filtered_queryset
 
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
             return RecipeCreateSerializer
         return RecipeSerializer
 
+    def get_response_cache_tags(self, data):
+        """Теги кеша для рецептов и их авторов в ответе."""
+        recipes = data["results"] if self.action == "list" else (data,)
+        return [
+            tag
+            for recipe in recipes
+            for tag in (
+                recipe_tag(recipe["id"]), author_tag(recipe["author"]["id"]),
+            )
+        ]
+
+    def get_etag(self, request, *args, **kwargs):
+        """ETag страницы рецептов без их сериализации.
+
+        Складывается из времени последнего изменения и количества
+        подходящих рецептов, адреса запроса, версий тегов кеша
+        и связей пользователя с рецептами и авторами. Версия тега
+        списка рецептов меняется и при пересчете их оценок, версия
+        тега пользователей - при изменении данных авторов, версия
+        тега ингредиентов - при их переименовании.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            if self.action == "retrieve":
+                queryset = queryset.filter(pk=kwargs[self.lookup_field])
+            state = queryset.aggregate(
+                updated=Max("updated_at"), count=Count("pk"),
+            )
+        except (TypeError, ValueError):
+            return None
+        if not state["count"] and self.action == "retrieve":
+            return None
+        membership = get_membership(request)
+        raw = "|".join(str(part) for part in (
+            state["updated"],
+            state["count"],
+            request.get_full_path(),
+            sorted(get_tag_versions(
+                (RECIPES_TAG, TAGS_TAG, USERS_TAG, INGREDIENTS_TAG),
+            ).items()),
+            sorted(membership.favorites),
+            sorted(membership.cart),
+            sorted(membership.subscriptions),
+        ))
+        return '"{}"'.format(hashlib.md5(raw.encode()).hexdigest())
+
+    @cache_public_response(RECIPES_TAG, TAGS_TAG)
+    @etag_precondition
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_public_response(TAGS_TAG)
+    @etag_precondition
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """Создает новый рецепт и связывает его с автором."""
-        serializer.save(author=self.request.user)
-
-    def add_favorite_or_cart(self, model, user, pk):
+        with transaction.atomic():
+            recipe = serializer.save(author=self.request.user)
+            change_counter(Recipe, recipe.author_id, 1)
+        bump_tags(recipe_tag(recipe.pk))
+
+    def perform_destroy(self, instance):
+        """Удаляет рецепт и уменьшает счетчик рецептов автора."""
+        with transaction.atomic():
+            instance.delete()
+            change_counter(Recipe, instance.author_id, -1)
+
+    def add_favorite_or_cart(self, model, request, pk):
+        """Добавляет рецепт в избранное или корзину.
+
+        Повторное добавление отсекает уникальное ограничение модели,
+        поэтому одновременные запросы не приводят к ошибке сервера.
+        """
         recipe = get_object_or_404(Recipe, id=pk)
-        obj = model.objects.filter(user=user, recipe=recipe)
-
-        if obj.exists():
+        try:
+            with transaction.atomic():
+                model.objects.create(user=request.user, recipe=recipe)
+                change_counter(model, recipe.id, 1)
+        except IntegrityError:
             return Response(
                 {"errors": "Рецепт уже добавлен в список покупок!"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        model.objects.create(user=user, recipe=recipe)
+        update_membership(request, model, recipe.id, added=True)
         serializer = FavoriteOrSubscribeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def remove_favorite_or_cart(self, model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
+    def remove_favorite_or_cart(self, model, request, pk):
+        """Удаляет рецепт из избранного или корзины одним запросом.
+
+        Запрос возвращает, удалил ли он запись, поэтому при
+        одновременном удалении счетчик и список покупок меняются
+        один раз.
+        """
+        with transaction.atomic():
+            deleted = delete_links(model, request.user, "recipe", (int(pk),))
+            if deleted:
+                change_counter(model, pk, -1)
+                if model is Cart:
+                    change_user_list(request.user.id, deleted, -1)
+        if deleted:
+            update_membership(request, model, int(pk), added=False)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response({'errors': 'Рецепт уже удален!'},
                         status=status.HTTP_400_BAD_REQUEST)
@@ -174,10 +471,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def favorite(self, request, pk=None):
         """Добавляет рецепт в избранное или удаляет его."""
         if request.method == "POST":
-            return self.add_favorite_or_cart(
-                Favorite, request.user, pk,
-            )
-        return self.remove_favorite_or_cart(Favorite, request.user, pk)
+            return self.add_favorite_or_cart(Favorite, request, pk)
+        return self.remove_favorite_or_cart(Favorite, request, pk)
 
     @action(
         methods=["POST", "DELETE"],
@@ -187,35 +482,91 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def shopping_cart(self, request, pk=None):
         """Добавляет рецепт в корзину покупок или удаляет его."""
         if request.method == "POST":
-            return self.add_favorite_or_cart(Cart, request.user, pk)
-        return self.remove_favorite_or_cart(Cart, request.user, pk)
+            return self.add_favorite_or_cart(Cart, request, pk)
+        return self.remove_favorite_or_cart(Cart, request, pk)
+
+    @action(
+        methods=["POST", "DELETE"],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+    )
+    def bulk_favorite(self, request):
+        """Добавляет несколько рецептов в избранное или удаляет их."""
+        return change_links(request, Favorite)
+
+    @action(
+        methods=["POST", "DELETE"],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+    )
+    def bulk_shopping_cart(self, request):
+        """Добавляет несколько рецептов в корзину или удаляет их."""
+        return change_links(request, Cart)
+
+    @action(methods=["GET"], detail=False)
+    def what_to_cook(self, request):
+        """Рецепты, которые можно приготовить из имеющихся ингредиентов.
+
+        Id ингредиентов передаются параметром ingredients через запятую,
+        max_missing ограничивает число недостающих ингредиентов.
+        Рецепты упорядочены по доле имеющихся ингредиентов, в ответе
+        для каждого указаны найденные и недостающие ингредиенты.
+        """
+        try:
+            ingredient_ids = {
+                int(value)
+                for param in request.query_params.getlist("ingredients")
+                for value in param.split(",")
+                if value
+            }
+        except ValueError:
+            raise ValidationError(
+                {"ingredients": "Укажите id ингредиентов через запятую."},
+            )
+        max_missing = request.query_params.get("max_missing")
+        if max_missing is not None:
+            try:
+                max_missing = int(max_missing)
+            except ValueError:
+                raise ValidationError({"max_missing": "Укажите целое число."})
+        page = self.paginate_queryset(
+            cookable_index.search(ingredient_ids, max_missing),
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page],
+        )
+        page = [item for item in page if item[0] in recipes]
+        data = RecipeSerializer(
+            [recipes[recipe_id] for recipe_id, _, _ in page],
+            many=True,
+            context=self.get_serializer_context(),
+        ).data
+        for item, (_, matched, total) in zip(data, page):
+            item["matched_ingredients"] = matched
+            item["missing_ingredients"] = total - matched
+        return self.get_paginated_response(data)
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_list(self, request):
+        """Текущий список покупок: ингредиенты с суммарным количеством."""
+        serializer = ShoppingListItemSerializer(
+            get_shopping_list(request.user), many=True,
+        )
+        return Response(serializer.data)
 
-    def create_cart(self, request):
+    def create_cart(self, request, file_type):
         """Формирование корзины покупок для скачивания."""
-        cart = Cart.objects.filter(user=request.user).all()
-        items = {}
-        for item in cart:
-            for amount_ingredient in item.recipe.amount_recipe.all():
-                ingredient = amount_ingredient.ingredient
-                name = ingredient.name
-                measuring_unit = ingredient.measurement_unit
-                amount = amount_ingredient.amount
-
-                if name not in items:
-                    items[name] = {
-                        "name": name,
-                        "measurement_unit": measuring_unit,
-                        "amount": amount,
-                    }
-                else:
-                    items[name]["amount"] += amount
-        content = [
-            f'{item["name"]} ({item["measurement_unit"]}) - {item["amount"]}\n'
-            for item in items.values()
-        ]
-        response = HttpResponse(content, content_type="text/plain")
+        content_type, render = SHOPPING_LIST_FORMATS[file_type]
+        items = get_shopping_list(request.user).iterator()
+        response = StreamingHttpResponse(
+            render(items), content_type=content_type,
+        )
         response["Content-Disposition"] = (
-            'attachment; filename="shopping_list.txt"'
+            f'attachment; filename="shopping_list.{file_type}"'
         )
         return response
 
@@ -225,8 +576,18 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,),
     )
     def download_shopping_cart(self, request):
-        """Скачивает корзину покупок в виде файла."""
+        """Скачивает корзину покупок в виде файла.
+
+        Формат файла задается параметром file_type: txt (по умолчанию),
+        csv или pdf.
+        """
         user = request.user
+        file_type = request.query_params.get("file_type", "txt")
+        if file_type not in SHOPPING_LIST_FORMATS:
+            raise ValidationError(
+                {"file_type": "Доступные форматы: "
+                 + ", ".join(SHOPPING_LIST_FORMATS)},
+            )
         if not user.cart_user.exists():
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        return self.create_cart(request)
+        return self.create_cart(request, file_type)
@@ -0,0 +1,9 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
+# Отключает постоянные соединения с базой, см. DJANGO_ASGI в settings.
+os.environ["DJANGO_ASGI"] = "True"
+
+application = get_asgi_application()
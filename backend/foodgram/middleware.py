@@ -0,0 +1,70 @@
+from contextlib import nullcontext
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+
+from api.metrics import record_request, track_request
+from foodgram.routers import (is_sticky, next_replica, read_from,
+                              stick_to_primary)
+
+# Пути, запросы к которым всегда читают из default: админка
+# показывает данные сразу после перенаправления с формы.
+PRIMARY_PATHS = ("/admin/",)
+
+
+def get_read_context(request):
+    """Чтение из реплики для безопасных запросов.
+
+    Клиент, недавно изменивший данные, читает из default, чтобы
+    сразу увидеть свои изменения.
+    """
+    if (request.method not in SAFE_METHODS
+            or request.path.startswith(PRIMARY_PATHS)
+            or is_sticky(request)):
+        return nullcontext()
+    return read_from(next_replica())
+
+
+def remember_write(request):
+    """После любого небезопасного запроса клиент читает из default.
+
+    Это касается и входа, регистрации, смены пароля и записи
+    в админке, а не только действий с рецептами.
+    """
+    if request.method not in SAFE_METHODS:
+        stick_to_primary(request)
+
+
+@sync_and_async_middleware
+def replica_middleware(get_response):
+    """Распределяет чтение по репликам по кругу."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with get_read_context(request):
+                response = await get_response(request)
+            remember_write(request)
+            return response
+    else:
+        def middleware(request):
+            with get_read_context(request):
+                response = get_response(request)
+            remember_write(request)
+            return response
+    return middleware
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Число и время запросов к базе, время сериализации и ответа."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with track_request() as metrics:
+                response = await get_response(request)
+            return record_request(request, response, metrics)
+    else:
+        def middleware(request):
+            with track_request() as metrics:
+                response = get_response(request)
+            return record_request(request, response, metrics)
+    return middleware
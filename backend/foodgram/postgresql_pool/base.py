@@ -0,0 +1,54 @@
+import threading
+
+import psycopg2.extras
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2.pool import ThreadedConnectionPool
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def get_pool(alias, size, conn_params):
+    """Пул соединений псевдонима базы данных, общий для потоков процесса."""
+    with _lock:
+        if alias not in _pools:
+            _pools[alias] = ThreadedConnectionPool(1, size, **conn_params)
+        return _pools[alias]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений в памяти процесса.
+
+    Соединение берется из пула при открытии и возвращается в пул
+    вместо закрытия, незавершенная транзакция при этом
+    откатывается. Размер пула задает ключ POOL_SIZE настроек базы,
+    он должен быть не меньше числа потоков процесса.
+    """
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(
+            self.alias, self.settings_dict["POOL_SIZE"], conn_params,
+        )
+        connection = pool.getconn()
+        if connection.closed:
+            pool.putconn(connection, close=True)
+            connection = pool.getconn()
+        options = self.settings_dict["OPTIONS"]
+        self.isolation_level = IsolationLevel(
+            options.get("isolation_level", IsolationLevel.READ_COMMITTED),
+        )
+        if "isolation_level" in options:
+            connection.isolation_level = self.isolation_level
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x,
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            pool = _pools[self.alias]
+            with self.wrap_database_errors:
+                pool.putconn(self.connection, close=bool(
+                    self.connection.closed or self.errors_occurred,
+                ))
@@ -0,0 +1,91 @@
+import hashlib
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+STICKY_KEY = "db_sticky_primary:{client}"
+
+_read_database = ContextVar("read_database", default=None)
+_replicas = None
+_replicas_lock = threading.Lock()
+
+
+def next_replica():
+    """Следующая реплика по кругу."""
+    global _replicas
+    with _replicas_lock:
+        if _replicas is None:
+            _replicas = itertools.cycle(settings.DATABASE_REPLICAS)
+        return next(_replicas)
+
+
+@contextmanager
+def read_from(alias):
+    """Направляет чтение в базу alias до выхода из блока."""
+    token = _read_database.set(alias)
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+def get_client_address(request):
+    """Адрес клиента: первый из X-Forwarded-For или REMOTE_ADDR."""
+    forwarded = request.headers.get("X-Forwarded-For", "")
+    return forwarded.split(",")[0].strip() or request.META.get("REMOTE_ADDR")
+
+
+def get_client_keys(request):
+    """Ключи клиента по токену, сессии и адресу.
+
+    Адрес связывает запись с чтением, когда между ними меняются
+    учетные данные: после входа по токену или регистрации
+    следующий запрос приходит уже с новым токеном или сессией.
+    """
+    credentials = (
+        request.headers.get("Authorization"),
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+        get_client_address(request),
+    )
+    return [
+        STICKY_KEY.format(client=hashlib.md5(value.encode()).hexdigest())
+        for value in credentials
+        if value
+    ]
+
+
+def stick_to_primary(request):
+    """Читать данные клиента из default, пока реплики догоняют запись."""
+    cache.set_many(
+        dict.fromkeys(get_client_keys(request), True),
+        settings.DB_STICKY_PRIMARY_SECONDS,
+    )
+
+
+def is_sticky(request):
+    keys = get_client_keys(request)
+    return bool(keys) and any(cache.get_many(keys).values())
+
+
+class ReplicaRouter:
+    """Маршрутизатор чтения на реплики.
+
+    Внутри read_from чтение идет в выбранную базу, запись
+    и миграции всегда в default.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     'corsheaders',
@@ -32,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "foodgram.middleware.metrics_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -67,6 +69,16 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "foodgram.wsgi.application"
 
+ASGI_APPLICATION = "foodgram.asgi.application"
+
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "") == "True"
+
+# Задается в asgi.py. Под ASGI синхронный код выполняется в разных
+# потоках, и постоянные соединения не переиспользуются, а копятся,
+# поэтому Django рекомендует их отключать. Переиспользовать
+# соединения под ASGI позволяет пул DB_POOL_SIZE.
+DJANGO_ASGI = os.getenv("DJANGO_ASGI", "") == "True"
+
 DATABASES = {
     "default": {
         "ENGINE": os.getenv("DB_ENGINE", "django.db.backends.postgresql"),
@@ -75,9 +87,64 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
         "HOST": os.getenv("DB_HOST", "127.0.0.1"),
         "PORT": os.getenv("DB_PORT", 5432),
+        "CONN_MAX_AGE": (
+            0 if DJANGO_ASGI else int(os.getenv("DB_CONN_MAX_AGE", 60))
+        ),
+        "CONN_HEALTH_CHECKS": (
+            os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True"
+        ),
     },
 }
 
+# Пул соединений в памяти процесса вместо постоянных соединений.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 0))
+if (DB_POOL_SIZE
+        and DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql"):
+    DATABASES["default"].update(
+        ENGINE="foodgram.postgresql_pool",
+        POOL_SIZE=DB_POOL_SIZE,
+        CONN_MAX_AGE=0,
+    )
+
+# Реплики для чтения в запросах GET, HEAD и OPTIONS. Хосты и имена
+# баз перечисляются через запятую, недостающие берутся из default.
+DB_REPLICA_HOSTS = [
+    host for host in os.getenv("DB_REPLICA_HOST", "").split(",") if host
+]
+DB_REPLICA_NAMES = [
+    name for name in os.getenv("DB_REPLICA_NAME", "").split(",") if name
+]
+DATABASE_REPLICAS = []
+for number in range(max(len(DB_REPLICA_HOSTS), len(DB_REPLICA_NAMES))):
+    alias = f"replica_{number + 1}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "PORT": os.getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+    if number < len(DB_REPLICA_HOSTS):
+        DATABASES[alias]["HOST"] = DB_REPLICA_HOSTS[number]
+    if number < len(DB_REPLICA_NAMES):
+        DATABASES[alias]["NAME"] = DB_REPLICA_NAMES[number]
+    DATABASE_REPLICAS.append(alias)
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ["foodgram.routers.ReplicaRouter"]
+    MIDDLEWARE.append("foodgram.middleware.replica_middleware")
+
+# Сколько секунд после записи чтение пользователя идет в default.
+DB_STICKY_PRIMARY_SECONDS = int(os.getenv("DB_STICKY_PRIMARY_SECONDS", 10))
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    },
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", 600))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -110,6 +177,60 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+MEMBERSHIP_CACHE_TIMEOUT = int(os.getenv("MEMBERSHIP_CACHE_TIMEOUT", 300))
+
+IMAGE_PROCESSING_WORKERS = int(os.getenv("IMAGE_PROCESSING_WORKERS", 2))
+
+TRENDING_HALF_LIFE_HOURS = int(os.getenv("TRENDING_HALF_LIFE_HOURS", 72))
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    "SHOPPING_LIST_PDF_FONT",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
+# Заголовок Server-Timing с числом и временем запросов к базе.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "True") == "True"
+
+# Токен для /api/metrics/, без него адрес отвечает 404.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Наибольшее число запросов к базе для методов представлений API.
+# Лимиты записи подобраны на рецептах из 15 ингредиентов, check_queries
+# проверяет их в CI.
+# При превышении "log" записывает предупреждение, "raise" - ошибка 500.
+QUERY_BUDGETS = {
+    "GET api:tags-list": 2,
+    "GET api:tags-detail": 2,
+    "GET api:ingredients-list": 2,
+    "GET api:ingredients-detail": 2,
+    "GET api:recipes-list": 12,
+    "GET api:recipes-detail": 10,
+    "GET api:recipes-what-to-cook": 10,
+    "GET api:recipes-download-shopping-cart": 4,
+    "GET api:recipes-shopping-list": 4,
+    "GET api:users-list": 6,
+    "GET api:users-detail": 6,
+    "GET api:users-me": 6,
+    "GET api:users-subscriptions": 6,
+    "POST api:recipes-list": 26,
+    "PUT api:recipes-detail": 30,
+    "PATCH api:recipes-detail": 30,
+    "DELETE api:recipes-detail": 24,
+    "POST api:recipes-favorite": 8,
+    "DELETE api:recipes-favorite": 8,
+    "POST api:recipes-shopping-cart": 10,
+    "DELETE api:recipes-shopping-cart": 10,
+    "POST api:users-subscribe": 12,
+    "DELETE api:users-subscribe": 8,
+    "POST api:recipes-bulk-favorite": 10,
+    "DELETE api:recipes-bulk-favorite": 10,
+    "POST api:recipes-bulk-shopping-cart": 10,
+    "DELETE api:recipes-bulk-shopping-cart": 10,
+    "POST api:users-bulk-subscribe": 10,
+    "DELETE api:users-bulk-subscribe": 10,
+}
+QUERY_BUDGET_ACTION = os.getenv("QUERY_BUDGET_ACTION", "log")
+
 AUTH_USER_MODEL = "users.CustomUser"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
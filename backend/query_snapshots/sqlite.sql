@@ -0,0 +1,52 @@
+-- users-list: 3
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+SELECT COUNT(*) AS "__count" FROM "users_customuser";
+SELECT "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "users_customuser" ORDER BY "users_customuser"."id" ASC LIMIT 10;
+-- users-me: 1
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+-- users-subscriptions: 4
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+SELECT COUNT(*) AS "__count" FROM "users_subscription" WHERE "users_subscription"."user_id" = %s;
+SELECT "users_subscription"."id", "users_subscription"."user_id", "users_subscription"."author_id", "users_subscription"."sub_date", %s AS "is_subscribed", T3."id", T3."password", T3."last_login", T3."is_superuser", T3."is_staff", T3."is_active", T3."date_joined", T3."role", T3."username", T3."first_name", T3."last_name", T3."email", T3."recipes_count", T3."followers_count" FROM "users_subscription" INNER JOIN "users_customuser" T3 ON ("users_subscription"."author_id" = T3."id") WHERE "users_subscription"."user_id" = %s ORDER BY "users_subscription"."id" DESC LIMIT 10;
+SELECT "recipes_recipe"."id", "recipes_recipe"."author_id", "recipes_recipe"."name", "recipes_recipe"."image", "recipes_recipe"."image_renditions", "recipes_recipe"."text", "recipes_recipe"."cooking_time", "recipes_recipe"."pub_date", "recipes_recipe"."updated_at", "recipes_recipe"."search_vector", "recipes_recipe"."favorites_count", "recipes_recipe"."carts_count", ROW_NUMBER() OVER (PARTITION BY "recipes_recipe"."author_id" ORDER BY "recipes_recipe"."pub_date" DESC) AS "row_number" FROM "recipes_recipe" WHERE "recipes_recipe"."author_id" IN (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ORDER BY "recipes_recipe"."pub_date" DESC;
+-- users-detail: 2
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+SELECT "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "users_customuser" WHERE "users_customuser"."id" = %s LIMIT 21;
+-- recipes-list: 7
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+SELECT DISTINCT "recipes_tag"."slug" FROM "recipes_recipe" LEFT OUTER JOIN "recipes_recipe_tags" ON ("recipes_recipe"."id" = "recipes_recipe_tags"."recipe_id") LEFT OUTER JOIN "recipes_tag" ON ("recipes_recipe_tags"."tag_id" = "recipes_tag"."id") ORDER BY "recipes_tag"."slug" ASC;
+SELECT MAX("recipes_recipe"."updated_at") AS "updated", COUNT("recipes_recipe"."id") AS "count" FROM "recipes_recipe";
+SELECT COUNT(*) AS "__count" FROM "recipes_recipe";
+SELECT "recipes_recipe"."id", "recipes_recipe"."author_id", "recipes_recipe"."name", "recipes_recipe"."image", "recipes_recipe"."image_renditions", "recipes_recipe"."text", "recipes_recipe"."cooking_time", "recipes_recipe"."pub_date", "recipes_recipe"."updated_at", "recipes_recipe"."search_vector", "recipes_recipe"."favorites_count", "recipes_recipe"."carts_count", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "recipes_recipe" INNER JOIN "users_customuser" ON ("recipes_recipe"."author_id" = "users_customuser"."id") ORDER BY "recipes_recipe"."pub_date" DESC LIMIT 10;
+SELECT ("recipes_recipe_tags"."recipe_id") AS "_prefetch_related_val_recipe_id", "recipes_tag"."id", "recipes_tag"."name", "recipes_tag"."color", "recipes_tag"."slug" FROM "recipes_tag" INNER JOIN "recipes_recipe_tags" ON ("recipes_tag"."id" = "recipes_recipe_tags"."tag_id") WHERE "recipes_recipe_tags"."recipe_id" IN (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ORDER BY "recipes_tag"."id" DESC;
+SELECT "recipes_amountingredient"."id", "recipes_amountingredient"."recipe_id", "recipes_amountingredient"."ingredient_id", "recipes_amountingredient"."amount", "recipes_ingredient"."id", "recipes_ingredient"."name", "recipes_ingredient"."measurement_unit" FROM "recipes_amountingredient" INNER JOIN "recipes_ingredient" ON ("recipes_amountingredient"."ingredient_id" = "recipes_ingredient"."id") WHERE "recipes_amountingredient"."recipe_id" IN (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ORDER BY "recipes_amountingredient"."id" DESC;
+-- recipes-download-shopping-cart: 3
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+SELECT %s AS "a" FROM "recipes_cart" WHERE "recipes_cart"."user_id" = %s LIMIT 1;
+SELECT "recipes_shoppinglistitem"."ingredient_id", "recipes_ingredient"."name", "recipes_ingredient"."measurement_unit", "recipes_shoppinglistitem"."amount" AS "total_amount" FROM "recipes_shoppinglistitem" INNER JOIN "recipes_ingredient" ON ("recipes_shoppinglistitem"."ingredient_id" = "recipes_ingredient"."id") WHERE "recipes_shoppinglistitem"."user_id" = %s ORDER BY "recipes_ingredient"."name" ASC, "recipes_ingredient"."measurement_unit" ASC;
+-- recipes-shopping-list: 2
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+SELECT "recipes_shoppinglistitem"."ingredient_id", "recipes_ingredient"."name", "recipes_ingredient"."measurement_unit", "recipes_shoppinglistitem"."amount" AS "total_amount" FROM "recipes_shoppinglistitem" INNER JOIN "recipes_ingredient" ON ("recipes_shoppinglistitem"."ingredient_id" = "recipes_ingredient"."id") WHERE "recipes_shoppinglistitem"."user_id" = %s ORDER BY "recipes_ingredient"."name" ASC, "recipes_ingredient"."measurement_unit" ASC;
+-- recipes-what-to-cook: 4
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+SELECT "recipes_recipe"."id", "recipes_recipe"."author_id", "recipes_recipe"."name", "recipes_recipe"."image", "recipes_recipe"."image_renditions", "recipes_recipe"."text", "recipes_recipe"."cooking_time", "recipes_recipe"."pub_date", "recipes_recipe"."updated_at", "recipes_recipe"."search_vector", "recipes_recipe"."favorites_count", "recipes_recipe"."carts_count", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "recipes_recipe" INNER JOIN "users_customuser" ON ("recipes_recipe"."author_id" = "users_customuser"."id") WHERE "recipes_recipe"."id" IN (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+SELECT ("recipes_recipe_tags"."recipe_id") AS "_prefetch_related_val_recipe_id", "recipes_tag"."id", "recipes_tag"."name", "recipes_tag"."color", "recipes_tag"."slug" FROM "recipes_tag" INNER JOIN "recipes_recipe_tags" ON ("recipes_tag"."id" = "recipes_recipe_tags"."tag_id") WHERE "recipes_recipe_tags"."recipe_id" IN (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ORDER BY "recipes_tag"."id" DESC;
+SELECT "recipes_amountingredient"."id", "recipes_amountingredient"."recipe_id", "recipes_amountingredient"."ingredient_id", "recipes_amountingredient"."amount", "recipes_ingredient"."id", "recipes_ingredient"."name", "recipes_ingredient"."measurement_unit" FROM "recipes_amountingredient" INNER JOIN "recipes_ingredient" ON ("recipes_amountingredient"."ingredient_id" = "recipes_ingredient"."id") WHERE "recipes_amountingredient"."recipe_id" IN (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ORDER BY "recipes_amountingredient"."id" DESC;
+-- recipes-detail: 6
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+SELECT DISTINCT "recipes_tag"."slug" FROM "recipes_recipe" LEFT OUTER JOIN "recipes_recipe_tags" ON ("recipes_recipe"."id" = "recipes_recipe_tags"."recipe_id") LEFT OUTER JOIN "recipes_tag" ON ("recipes_recipe_tags"."tag_id" = "recipes_tag"."id") ORDER BY "recipes_tag"."slug" ASC;
+SELECT MAX("recipes_recipe"."updated_at") AS "updated", COUNT("recipes_recipe"."id") AS "count" FROM "recipes_recipe" WHERE "recipes_recipe"."id" = %s;
+SELECT "recipes_recipe"."id", "recipes_recipe"."author_id", "recipes_recipe"."name", "recipes_recipe"."image", "recipes_recipe"."image_renditions", "recipes_recipe"."text", "recipes_recipe"."cooking_time", "recipes_recipe"."pub_date", "recipes_recipe"."updated_at", "recipes_recipe"."search_vector", "recipes_recipe"."favorites_count", "recipes_recipe"."carts_count", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "recipes_recipe" INNER JOIN "users_customuser" ON ("recipes_recipe"."author_id" = "users_customuser"."id") WHERE "recipes_recipe"."id" = %s LIMIT 21;
+SELECT ("recipes_recipe_tags"."recipe_id") AS "_prefetch_related_val_recipe_id", "recipes_tag"."id", "recipes_tag"."name", "recipes_tag"."color", "recipes_tag"."slug" FROM "recipes_tag" INNER JOIN "recipes_recipe_tags" ON ("recipes_tag"."id" = "recipes_recipe_tags"."tag_id") WHERE "recipes_recipe_tags"."recipe_id" IN (%s) ORDER BY "recipes_tag"."id" DESC;
+SELECT "recipes_amountingredient"."id", "recipes_amountingredient"."recipe_id", "recipes_amountingredient"."ingredient_id", "recipes_amountingredient"."amount", "recipes_ingredient"."id", "recipes_ingredient"."name", "recipes_ingredient"."measurement_unit" FROM "recipes_amountingredient" INNER JOIN "recipes_ingredient" ON ("recipes_amountingredient"."ingredient_id" = "recipes_ingredient"."id") WHERE "recipes_amountingredient"."recipe_id" IN (%s) ORDER BY "recipes_amountingredient"."id" DESC;
+-- ingredients-list: 1
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+-- ingredients-detail: 2
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+SELECT "recipes_ingredient"."id", "recipes_ingredient"."name", "recipes_ingredient"."measurement_unit" FROM "recipes_ingredient" WHERE "recipes_ingredient"."id" = %s LIMIT 21;
+-- tags-list: 2
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+SELECT "recipes_tag"."id", "recipes_tag"."name", "recipes_tag"."color", "recipes_tag"."slug" FROM "recipes_tag" ORDER BY "recipes_tag"."id" DESC;
+-- tags-detail: 2
+SELECT "authtoken_token"."key", "authtoken_token"."user_id", "authtoken_token"."created", "users_customuser"."id", "users_customuser"."password", "users_customuser"."last_login", "users_customuser"."is_superuser", "users_customuser"."is_staff", "users_customuser"."is_active", "users_customuser"."date_joined", "users_customuser"."role", "users_customuser"."username", "users_customuser"."first_name", "users_customuser"."last_name", "users_customuser"."email", "users_customuser"."recipes_count", "users_customuser"."followers_count" FROM "authtoken_token" INNER JOIN "users_customuser" ON ("authtoken_token"."user_id" = "users_customuser"."id") WHERE "authtoken_token"."key" = %s LIMIT 21;
+SELECT "recipes_tag"."id", "recipes_tag"."name", "recipes_tag"."color", "recipes_tag"."slug" FROM "recipes_tag" WHERE "recipes_tag"."id" = %s LIMIT 21;
@@ -2,7 +2,10 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 
 from recipes.models import (AmountIngredient, Cart, Favorite, Ingredient,
-                            Recipe, Tag)
+                            Recipe, ShoppingListItem, Tag)
+from recipes.search import update_search_index
+from recipes.shopping_list import (change_recipe_lists, lock_recipes,
+                                   remove_empty)
 
 User = get_user_model()
 
@@ -19,7 +22,8 @@ class RecipeAdmin(admin.ModelAdmin):
     """Настройка административной панели рецептов."""
 
     inlines = (AmountIngredientAdmin,)
-    list_display = ("author", "name", "text", "get_favorite_count")
+    list_display = ("author", "name", "text", "favorites_count", "carts_count")
+    readonly_fields = ("favorites_count", "carts_count")
     search_fields = (
         "name", "cooking_time", "author__username", "ingredients__name",
     )
@@ -49,10 +53,26 @@ class RecipeAdmin(admin.ModelAdmin):
             ],
         )
 
-    @admin.display(description="В избранном")
-    def get_favorite_count(self, obj):
-        """Отображения количества добавлений рецепта в избранное."""
-        return obj.in_favorites.count()
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("author")
+
+    def save_related(self, request, form, formsets, change):
+        """Сохраняет ингредиенты и один раз обновляет поиск по рецепту.
+
+        Списки покупок пользователей с рецептом в корзине меняются
+        так же, как при изменении рецепта через API: старые количества
+        вычитаются до сохранения ингредиентов, новые добавляются после.
+        Админка сохраняет рецепт в одной транзакции.
+        """
+        recipe = form.instance
+        if change:
+            lock_recipes((recipe.pk,), exclusive=True)
+            change_recipe_lists(recipe.pk, -1)
+        super().save_related(request, form, formsets, change)
+        if change:
+            change_recipe_lists(recipe.pk, 1)
+            remove_empty(recipe.pk)
+        update_search_index(recipe)
 
 
 @admin.register(Tag)
@@ -85,3 +105,13 @@ class CartAdmin(admin.ModelAdmin):
 
     ordering = ("user",)
     search_fields = ("recipe", "user")
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    """Настройка административной панели списков покупок."""
+
+    list_display = ("user", "ingredient", "amount", "recipes_count")
+    readonly_fields = ("user", "ingredient", "amount", "recipes_count")
+    search_fields = ("user__username", "ingredient__name")
+    list_select_related = ("user", "ingredient")
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class RecipesConfig(AppConfig):
     name = "recipes"
+
+    def ready(self):
+        import recipes.signals  # noqa: F401
+        from recipes.search import create_search_backend
+
+        post_migrate.connect(create_search_backend, sender=self)
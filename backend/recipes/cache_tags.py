@@ -0,0 +1,46 @@
+import time
+
+from django.core.cache import cache
+
+TAG_KEY = "cache_tag:{tag}"
+RECIPES_TAG = "recipes"
+TAGS_TAG = "tags"
+INGREDIENTS_TAG = "ingredients"
+# Меняется при изменении данных любого пользователя.
+USERS_TAG = "users"
+
+
+def recipe_tag(recipe_id):
+    return f"recipe:{recipe_id}"
+
+
+def author_tag(author_id):
+    return f"author:{author_id}"
+
+
+def membership_tag(user_id):
+    return f"membership:{user_id}"
+
+
+def get_tag_versions(tags):
+    """Текущие версии тегов зависимостей кеша.
+
+    Отсутствующая версия инициализируется текущим временем, чтобы
+    после вытеснения ключа из кеша версия не совпала с прежней.
+    """
+    keys = {TAG_KEY.format(tag=tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, time.time_ns(), timeout=None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_tags(*tags):
+    """Меняет версии тегов, делая зависящие от них данные устаревшими."""
+    for tag in tags:
+        key = TAG_KEY.format(tag=tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
@@ -0,0 +1,87 @@
+import threading
+
+from recipes.cache_tags import bump_tags, get_tag_versions
+from recipes.models import AmountIngredient
+
+VERSION_TAG = "recipe_ingredients"
+
+
+def bump_version():
+    """Помечает индекс ингредиентов рецептов устаревшим."""
+    bump_tags(VERSION_TAG)
+
+
+def count_bits(mask):
+    return bin(mask).count("1")
+
+
+class CookableIndex:
+    """Индекс наборов ингредиентов рецептов в памяти процесса.
+
+    Каждому ингредиенту соответствует бит, набор ингредиентов
+    рецепта хранится целым числом - битовой маской. Покрытие
+    рецепта набором продуктов пользователя считается пересечением
+    масок. Индекс перестраивается, когда в кеше меняется версия
+    тега VERSION_TAG.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = ({}, ())
+
+    def _build(self):
+        bits = {}
+        masks = {}
+        rows = AmountIngredient.objects.order_by().values_list(
+            "recipe_id", "ingredient_id",
+        )
+        for recipe_id, ingredient_id in rows.iterator():
+            bit = bits.setdefault(ingredient_id, 1 << len(bits))
+            masks[recipe_id] = masks.get(recipe_id, 0) | bit
+        recipes = tuple(
+            (recipe_id, mask, count_bits(mask))
+            for recipe_id, mask in masks.items()
+        )
+        return bits, recipes
+
+    def _get_index(self):
+        version = get_tag_versions((VERSION_TAG,))[VERSION_TAG]
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._index = self._build()
+                    self._version = version
+        return self._index
+
+    def search(self, ingredient_ids, max_missing=None):
+        """Рецепты, которые можно приготовить из данных ингредиентов.
+
+        Возвращает список (id рецепта, найдено, всего ингредиентов)
+        для рецептов хотя бы с одним совпадением. Сначала идут
+        рецепты с большей долей имеющихся ингредиентов, при равной
+        доле - с меньшим числом недостающих.
+        """
+        bits, recipes = self._get_index()
+        have = 0
+        for ingredient_id in ingredient_ids:
+            have |= bits.get(ingredient_id, 0)
+        if not have:
+            return []
+        results = []
+        for recipe_id, mask, total in recipes:
+            matched = count_bits(mask & have)
+            if not matched:
+                continue
+            if max_missing is not None and total - matched > max_missing:
+                continue
+            results.append((recipe_id, matched, total))
+        results.sort(
+            key=lambda item: (
+                -item[1] / item[2], item[2] - item[1], -item[0],
+            ),
+        )
+        return results
+
+
+cookable_index = CookableIndex()
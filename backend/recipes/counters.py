@@ -0,0 +1,68 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Cart, Favorite, Recipe
+from users.models import CustomUser, Subscription
+
+COUNTERS = {
+    Favorite: (Recipe, "favorites_count", "recipe"),
+    Cart: (Recipe, "carts_count", "recipe"),
+    Recipe: (CustomUser, "recipes_count", "author"),
+    Subscription: (CustomUser, "followers_count", "author"),
+}
+
+
+def change_counter(model, object_id, delta):
+    """Изменяет счетчик объекта, к которому относится запись model.
+
+    Счетчик меняется выражением F() в базе данных, поэтому
+    одновременные изменения не теряются.
+    """
+    change_counters(model, (object_id,), delta)
+
+
+def change_counters(model, object_ids, delta):
+    """Изменяет счетчики нескольких объектов одним запросом.
+
+    Счетчик не опускается ниже нуля: разошедшийся с данными счетчик
+    не должен приводить к ошибке ограничения при удалении записи.
+    Такие счетчики исправляет команда recount.
+    """
+    target, field, _ = COUNTERS[model]
+    value = F(field) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    target.objects.filter(pk__in=object_ids).update(**{field: value})
+
+
+def count_subquery(model, relation):
+    """Количество записей model, ссылающихся на объект внешнего запроса."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{relation: OuterRef("pk")})
+            .order_by()
+            .values(relation)
+            .annotate(count=Count("pk"))
+            .values("count"),
+        ),
+        0,
+    )
+
+
+def recount():
+    """Пересчитывает разошедшиеся счетчики.
+
+    Возвращает количество исправленных объектов по каждому счетчику.
+    """
+    fixed = {}
+    for model, (target, field, relation) in COUNTERS.items():
+        actual = count_subquery(model, relation)
+        drifted = target.objects.annotate(actual=actual).exclude(
+            **{field: F("actual")},
+        )
+        fixed[f"{target._meta.model_name}.{field}"] = (
+            target.objects.filter(pk__in=drifted.values("pk")).update(
+                **{field: actual},
+            )
+        )
+    return fixed
@@ -0,0 +1,148 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.cache_tags import bump_tags, recipe_tag
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SIZES = {
+    "list": (480, 480),
+    "detail": (1200, 1200),
+}
+RENDITION_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 60},
+}
+RENDITIONS_DIR = "static/recipe_images/renditions"
+
+_executor = None
+
+
+def get_formats():
+    """Форматы, которые поддерживает установленный Pillow."""
+    Image.init()
+    return {
+        name: options
+        for name, options in RENDITION_FORMATS.items()
+        if options["format"] in Image.SAVE
+    }
+
+
+def get_executor():
+    """Пул потоков для обработки изображений."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix="recipe-images",
+        )
+    return _executor
+
+
+def render_image(image, size, options):
+    """Уменьшенная копия изображения без метаданных."""
+    rendition = image.copy()
+    rendition.thumbnail(size)
+    buffer = io.BytesIO()
+    rendition.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def create_renditions(recipe):
+    """Создает уменьшенные копии изображения рецепта.
+
+    Изображение поворачивается по EXIF, метаданные отбрасываются,
+    для каждого размера сохраняются копии во всех доступных
+    форматах. Возвращает имя исходного файла и пути копий:
+    {"source": имя, "sizes": {размер: {формат: путь}}}.
+    """
+    storage = recipe.image.storage
+    with recipe.image.open("rb") as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    base = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    renditions = {}
+    for size_name, size in RENDITION_SIZES.items():
+        renditions[size_name] = {}
+        for format_name, options in get_formats().items():
+            path = storage.save(
+                f"{RENDITIONS_DIR}/{base}_{size_name}.{format_name}",
+                ContentFile(render_image(image, size, options)),
+            )
+            renditions[size_name][format_name] = path
+    return {"source": recipe.image.name, "sizes": renditions}
+
+
+def process_recipe_image(recipe_id, image_name):
+    """Обработка изображения рецепта.
+
+    Если пока шла обработка изображение рецепта заменили, результат
+    отбрасывается: новое изображение обработает своя задача.
+    Файлы копий могут использоваться другими рецептами с тем же
+    изображением, поэтому ненужные копии удаляет collect_images.
+    """
+    try:
+        recipe = Recipe.objects.filter(pk=recipe_id, image=image_name).first()
+        if recipe is None:
+            return
+        renditions = create_renditions(recipe)
+        updated = Recipe.objects.filter(
+            pk=recipe_id, image=image_name,
+        ).update(image_renditions=renditions, updated_at=timezone.now())
+        if updated:
+            bump_tags(recipe_tag(recipe_id))
+    except Exception:
+        logger.exception(
+            "Не удалось обработать изображение рецепта %s", recipe_id,
+        )
+
+
+def missing_renditions(queryset):
+    """Пары (id, изображение) рецептов queryset без готовых копий.
+
+    Копий нет, если задача обработки потерялась (воркер перезапущен
+    или упал) или еще не выполнена, а также если копии остались
+    от прежнего изображения.
+    """
+    return [
+        (pk, image)
+        for pk, image, renditions in queryset.values_list(
+            "pk", "image", "image_renditions",
+        ).iterator()
+        if (renditions or {}).get("source") != image
+    ]
+
+
+def run_in_worker(recipe_id, image_name):
+    """Обработка в потоке пула со своим соединением с базой."""
+    close_old_connections()
+    try:
+        process_recipe_image(recipe_id, image_name)
+    finally:
+        close_old_connections()
+
+
+def schedule_image_processing(recipe):
+    """Ставит обработку изображения в очередь после фиксации транзакции.
+
+    При IMAGE_PROCESSING_WORKERS = 0 обработка выполняется сразу,
+    что удобно для локальной разработки.
+    """
+    recipe_id, image_name = recipe.pk, recipe.image.name
+
+    def submit():
+        if settings.IMAGE_PROCESSING_WORKERS:
+            get_executor().submit(run_in_worker, recipe_id, image_name)
+        else:
+            process_recipe_image(recipe_id, image_name)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,72 @@
+import threading
+from bisect import bisect_left
+
+from recipes.cache_tags import INGREDIENTS_TAG, bump_tags, get_tag_versions
+from recipes.models import Ingredient
+
+VERSION_TAG = INGREDIENTS_TAG
+
+
+def bump_version():
+    """Помечает индекс ингредиентов устаревшим во всех процессах."""
+    bump_tags(VERSION_TAG)
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов в памяти процесса.
+
+    Хранит отсортированный массив названий в нижнем регистре,
+    по которому префиксный поиск выполняется бинарным поиском.
+    Индекс строится при первом обращении и перестраивается,
+    когда в кеше меняется версия тега VERSION_TAG.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = ((), ())
+
+    def _build(self):
+        items = sorted(
+            Ingredient.objects.values("id", "name", "measurement_unit"),
+            key=lambda item: (item["name"].lower(), item["id"]),
+        )
+        keys = tuple(item["name"].lower() for item in items)
+        return keys, tuple(items)
+
+    def _get_index(self):
+        version = get_tag_versions((VERSION_TAG,))[VERSION_TAG]
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._index = self._build()
+                    self._version = version
+        return self._index
+
+    def search(self, query):
+        """Поиск ингредиентов по названию.
+
+        Сначала идут точные совпадения, затем совпадения по началу
+        названия, затем названия, содержащие запрос.
+        """
+        keys, items = self._get_index()
+        query = query.strip().lower()
+        if not query:
+            return list(items)
+        exact = []
+        prefix = []
+        position = bisect_left(keys, query)
+        while position < len(keys) and keys[position].startswith(query):
+            if keys[position] == query:
+                exact.append(items[position])
+            else:
+                prefix.append(items[position])
+            position += 1
+        contains = [
+            item for key, item in zip(keys, items)
+            if query in key and not key.startswith(query)
+        ]
+        return exact + prefix + contains
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,61 @@
+from django.db import connection
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def insert_links(model, user, relation, object_ids):
+    """Вставляет записи model пользователя, пропуская существующие.
+
+    Возвращает id объектов, записи для которых действительно
+    вставлены этим запросом: INSERT ... ON CONFLICT DO NOTHING
+    RETURNING (PostgreSQL, SQLite 3.35+). Поэтому одновременные
+    запросы не учитывают одну запись дважды.
+    """
+    object_ids = list(object_ids)
+    if not object_ids:
+        return set()
+    opts = model._meta
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+    params = []
+    for object_id in object_ids:
+        link = model(user=user, **{f"{relation}_id": object_id})
+        params.extend(
+            field.get_db_prep_save(field.pre_save(link, True), connection)
+            for field in fields
+        )
+    row = f"({', '.join(['%s'] * len(fields))})"
+    sql = (
+        f"INSERT INTO {quote(opts.db_table)} "
+        f"({', '.join(quote(field.column) for field in fields)}) "
+        f"VALUES {', '.join([row] * len(object_ids))} "
+        "ON CONFLICT DO NOTHING "
+        f"RETURNING {quote(opts.get_field(relation).column)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {object_id for object_id, in cursor.fetchall()}
+
+
+def delete_links(model, user, relation, object_ids):
+    """Удаляет записи model пользователя.
+
+    Возвращает id объектов, записи для которых действительно удалены
+    этим запросом (DELETE ... RETURNING). Сигналы удаления не
+    отправляются, связанные данные обновляет вызывающий код.
+    """
+    object_ids = list(object_ids)
+    if not object_ids:
+        return set()
+    opts = model._meta
+    column = quote(opts.get_field(relation).column)
+    sql = (
+        f"DELETE FROM {quote(opts.db_table)} "
+        f"WHERE {quote(opts.get_field('user').column)} = %s "
+        f"AND {column} IN ({', '.join(['%s'] * len(object_ids))}) "
+        f"RETURNING {column}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user.pk, *object_ids])
+        return {object_id for object_id, in cursor.fetchall()}
@@ -0,0 +1,84 @@
+import os
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+GRACE_MINUTES = 60
+
+
+def walk(storage, path):
+    """Пути всех файлов каталога хранилища и его подкаталогов."""
+    if not storage.exists(path):
+        return
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield os.path.join(path, name).replace("\\", "/")
+    for name in directories:
+        yield from walk(storage, os.path.join(path, name))
+
+
+def get_referenced_files():
+    """Файлы, на которые ссылаются рецепты: изображения и их копии."""
+    referenced = set()
+    for image, renditions in Recipe.objects.values_list(
+        "image", "image_renditions",
+    ).iterator():
+        referenced.add(image)
+        for formats in (renditions or {}).get("sizes", {}).values():
+            referenced.update(formats.values())
+    return referenced
+
+
+class Command(BaseCommand):
+    """Удаление изображений, на которые не ссылается ни один рецепт.
+
+    Сначала отмечаются файлы из Recipe.image и копии из
+    Recipe.image_renditions, затем удаляются остальные файлы каталога
+    изображений. Недавно измененные файлы не трогаются: они могут
+    принадлежать еще не сохраненному рецепту или обрабатываемому
+    изображению.
+    """
+
+    help = "Удаляет изображения рецептов без ссылок."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=GRACE_MINUTES,
+            help="Не удалять файлы моложе указанного числа минут.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать, какие файлы будут удалены.",
+        )
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field("image")
+        storage = field.storage
+        threshold = timezone.now() - timedelta(minutes=options["grace"])
+        referenced = get_referenced_files()
+        removed = 0
+        freed = 0
+        for path in walk(storage, field.upload_to.rstrip("/")):
+            if path in referenced:
+                continue
+            if storage.get_modified_time(path) > threshold:
+                continue
+            size = storage.size(path)
+            if options["dry_run"]:
+                self.stdout.write(path)
+            else:
+                storage.delete(path)
+            removed += 1
+            freed += size
+        action = "Будет удалено" if options["dry_run"] else "Удалено"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} файлов: {removed}, {freed / 1024 / 1024:.1f} МБ.",
+            ),
+        )
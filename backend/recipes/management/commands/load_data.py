@@ -1,36 +1,140 @@
+import csv
 import json
 import os
+import time
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
 from django.db.utils import IntegrityError
 
+from recipes.ingredient_index import bump_version
 from recipes.models import Ingredient
 
 FILE_PATH = os.path.join(settings.BASE_DIR, "data", "ingredients.json")
+BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 64 * 1024
 
 
-def import_json_data():
-    """Импорт данных из JSON-файла в базу данных.
-    Читает данные из JSON-файла, создает или обновляет записи
-    в таблице ингредиентов.
+def decode_items(decoder, buffer):
+    """Разбор полных объектов в начале буфера.
+
+    Возвращает список пар (название, единица измерения)
+    и неразобранный остаток буфера.
+    """
+    items = []
+    position = 0
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position == len(buffer) or buffer[position] == "]":
+            break
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            break
+        items.append((item["name"], item["measurement_unit"]))
+    return items, buffer[position:]
+
+
+def read_json(path):
+    """Потоковое чтение ингредиентов из JSON-массива.
+
+    Файл читается частями по READ_CHUNK_SIZE, объекты массива
+    разбираются по мере поступления без загрузки всего файла в память.
     """
-    with open(FILE_PATH, "r", encoding="utf-8") as file:
-        data = json.load(file)
-        for item in data:
-            ingredient, created = Ingredient.objects.get_or_create(**item)
-            if not created:
-                for key, value in item.items():
-                    setattr(ingredient, key, value)
-                ingredient.save()
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as file:
+        buffer = file.read(READ_CHUNK_SIZE).lstrip()
+        if not buffer.startswith("["):
+            raise CommandError("Ожидался JSON-массив ингредиентов.")
+        buffer = buffer[1:]
+        while True:
+            items, buffer = decode_items(decoder, buffer)
+            yield from items
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer += chunk
+    if buffer.strip() != "]":
+        raise CommandError("Некорректный JSON-файл ингредиентов.")
+
+
+def read_csv(path):
+    """Построчное чтение ингредиентов из CSV-файла без заголовка."""
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        for row in csv.reader(file):
+            if row:
+                yield row[0], row[1]
+
+
+READERS = {
+    ".json": read_json,
+    ".csv": read_csv,
+}
+
+
+def import_ingredients(path, batch_size):
+    """Импорт ингредиентов из JSON- или CSV-файла в базу данных.
+
+    Повторы отбрасываются в памяти, записи сохраняются пачками
+    через bulk_create, уже существующие пары названия и единицы
+    измерения пропускаются. Возвращает количество обработанных записей.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise CommandError(f"Неподдерживаемый формат файла: {extension}.")
+    seen = set()
+    batch = []
+    total = 0
+    with transaction.atomic():
+        for name, measurement_unit in READERS[extension](path):
+            key = (name.strip(), measurement_unit.strip())
+            if key in seen:
+                continue
+            seen.add(key)
+            batch.append(Ingredient(name=key[0], measurement_unit=key[1]))
+            if len(batch) >= batch_size:
+                total += save_batch(batch)
+                batch = []
+        if batch:
+            total += save_batch(batch)
+    bump_version()
+    return total
+
+
+def save_batch(batch):
+    """Сохранение пачки ингредиентов без перезаписи существующих.
+
+    Конфликт возможен только по названию и единице измерения, других
+    полей у ингредиента нет, поэтому существующие строки не меняются.
+    """
+    Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+    return len(batch)
 
 
 class Command(BaseCommand):
-    """Импорт данных о ингредиентах из JSON-файла."""
+    """Импорт данных о ингредиентах из JSON- или CSV-файла."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=FILE_PATH,
+            help="Путь к файлу ingredients.json или ingredients.csv.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Количество записей в одном запросе на вставку.",
+        )
 
     def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("Размер пачки должен быть больше 0.")
+        started = time.monotonic()
         try:
-            import_json_data()
+            total = import_ingredients(options["path"], options["batch_size"])
         except IntegrityError as error:
             self.stdout.write(
                 self.style.WARNING(
@@ -39,9 +143,12 @@ class Command(BaseCommand):
                 ),
             )
         else:
+            elapsed = time.monotonic() - started
             self.stdout.write(
                 self.style.SUCCESS(
                     "Загрузка списка ингредиентов "
-                    "с единицами измерения завершена.",
+                    f"с единицами измерения завершена: {total} записей "
+                    f"за {elapsed:.2f} с "
+                    f"({total / max(elapsed, 1e-9):.0f} записей/с).",
                 ),
             )
@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand
+
+from recipes.images import missing_renditions, process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Создание уменьшенных копий изображений рецептов.
+
+    Копии создаются в пуле потоков процесса, поэтому задачи в очереди
+    теряются при перезапуске или падении воркера. С флагом --missing
+    обрабатываются только изображения без готовых копий, поэтому
+    команду можно запускать при каждом деплое.
+    """
+
+    help = "Создает уменьшенные копии изображений рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Обработать только изображения без готовых копий.",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.order_by("pk")
+        if options["missing"]:
+            images = missing_renditions(recipes)
+        else:
+            images = list(recipes.values_list("pk", "image"))
+        for recipe_id, image_name in images:
+            process_recipe_image(recipe_id, image_name)
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано изображений: {len(images)}.",
+        ))
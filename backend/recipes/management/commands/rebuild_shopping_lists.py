@@ -0,0 +1,40 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.shopping_list import rebuild, users_without_lists
+
+
+class Command(BaseCommand):
+    """Пересчет списков покупок по корзинам пользователей.
+
+    Списки меняются вместе с корзинами и ингредиентами рецептов, но
+    могут разойтись с данными при изменении ингредиентов в админке
+    или пакетной загрузке корзин. С --missing собираются только
+    отсутствующие списки, например после первого деплоя.
+    """
+
+    help = "Пересчитывает списки покупок пользователей."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="users",
+            type=int,
+            help="Id пользователя, можно указать несколько раз.",
+        )
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Только пользователи с корзиной, но без списка покупок.",
+        )
+
+    def handle(self, *args, **options):
+        users = options["users"]
+        with transaction.atomic():
+            if options["missing"]:
+                users = users_without_lists()
+            count = rebuild(users)
+        self.stdout.write(self.style.SUCCESS(
+            f"Списки покупок пересчитаны, строк: {count}.",
+        ))
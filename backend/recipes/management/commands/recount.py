@@ -0,0 +1,21 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount
+
+
+class Command(BaseCommand):
+    """Пересчет счетчиков избранного, корзин, рецептов и подписчиков.
+
+    Счетчики меняются вместе с записями через API, но могут разойтись
+    с данными при изменениях в админке или каскадном удалении.
+    """
+
+    help = "Исправляет разошедшиеся счетчики."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = recount()
+        for counter, count in fixed.items():
+            self.stdout.write(f"{counter}: исправлено {count}")
+        self.stdout.write(self.style.SUCCESS("Счетчики пересчитаны."))
@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+
+from recipes.scores import refresh_scores
+
+
+class Command(BaseCommand):
+    """Пересчет оценок популярности рецептов.
+
+    Учитываются только записи избранного и корзин, добавленные после
+    предыдущего запуска. Команду удобно запускать по расписанию.
+    """
+
+    help = "Обновляет оценки популярности рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Пересчитать оценки по всем записям.",
+        )
+
+    def handle(self, *args, **options):
+        popular, trending = refresh_scores(full=options["full"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обновлено оценок: популярность - {popular}, "
+                f"популярность за последнее время - {trending}.",
+            ),
+        )
@@ -0,0 +1,37 @@
+from django.core.management import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import missing_from_search_index, update_search_index
+
+
+class Command(BaseCommand):
+    """Заполнение поискового индекса рецептов.
+
+    Индекс обновляется при сохранении рецепта, но рецепты, созданные
+    до появления поиска или загруженные в обход API, в нем отсутствуют.
+    С флагом --missing индексируются только такие рецепты, поэтому
+    команду можно запускать при каждом деплое: прерванный запуск
+    продолжается с того же места.
+    """
+
+    help = "Пересчитывает поисковые данные рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Индексировать только рецепты, которых нет в индексе.",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.order_by("pk")
+        if options["missing"]:
+            recipes = missing_from_search_index(recipes)
+        # Список выбирается заранее: при --missing запрос читает
+        # индекс, который меняется в цикле.
+        recipes = list(recipes.only("pk", "name", "text"))
+        for recipe in recipes:
+            update_search_index(recipe)
+        self.stdout.write(self.style.SUCCESS(
+            f"Проиндексировано рецептов: {len(recipes)}.",
+        ))
@@ -0,0 +1,235 @@
+import base64
+import itertools
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import transaction
+
+from recipes import cookable
+from recipes.cache_tags import RECIPES_TAG, bump_tags
+from recipes.counters import recount
+from recipes.management.commands.load_data import (BATCH_SIZE, FILE_PATH,
+                                                   import_ingredients)
+from recipes.models import (AmountIngredient, Cart, Favorite, Ingredient,
+                            Recipe, Tag)
+from recipes.scores import refresh_scores
+from recipes.search import update_search_index
+from recipes.shopping_list import rebuild
+from users.models import CustomUser, Subscription
+
+PASSWORD = "benchmark-password"
+# Прозрачное изображение 1x1 в формате PNG, общее для всех рецептов.
+IMAGE = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChw"
+    "GA60e6kgAAAABJRU5ErkJggg==",
+)
+WORDS = (
+    "суп", "салат", "пирог", "омлет", "каша", "рагу", "паста", "плов",
+    "запеканка", "блины", "котлеты", "соус", "десерт", "хлеб", "жаркое",
+)
+
+
+def zipf_weights(count, exponent=1.0):
+    """Накопленные веса по закону Ципфа для random.choices.
+
+    Первые элементы выбираются чаще остальных.
+    """
+    return list(itertools.accumulate(
+        1 / (rank + 1) ** exponent for rank in range(count)
+    ))
+
+
+def sample(rng, population, cum_weights, count):
+    """count разных элементов с вероятностями по весам."""
+    count = min(count, len(population))
+    chosen = set()
+    while len(chosen) < count:
+        chosen.update(rng.choices(
+            population, cum_weights=cum_weights, k=count - len(chosen),
+        ))
+    return chosen
+
+
+class Command(BaseCommand):
+    """Синтетические данные для измерения производительности API.
+
+    Создает пользователей, рецепты, подписки, избранное и корзины
+    пакетными вставками, затем пересчитывает счетчики и списки
+    покупок. Ингредиенты загружаются из data/ingredients.json,
+    если их еще нет. Популярность ингредиентов, авторов и рецептов
+    распределена по закону Ципфа, как в реальных данных: немногие
+    авторы пишут большую часть рецептов и собирают большую часть
+    подписчиков. При одинаковом --seed данные получаются одинаковыми.
+    """
+
+    help = "Заполняет базу синтетическими данными для бенчмарков."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument(
+            "--follows", type=int, default=20,
+            help="Среднее число подписок пользователя.",
+        )
+        parser.add_argument(
+            "--favorites", type=int, default=30,
+            help="Среднее число рецептов в избранном пользователя.",
+        )
+        parser.add_argument(
+            "--carts", type=int, default=5,
+            help="Среднее число рецептов в корзине пользователя.",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--prefix", default="bench")
+        parser.add_argument("--path", default=FILE_PATH)
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Удалить данные предыдущего запуска с тем же --prefix.",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 2 or options["recipes"] < 1:
+            raise CommandError("Нужно не меньше 2 пользователей и 1 рецепта.")
+        self.rng = random.Random(options["seed"])
+        self.prefix = options["prefix"]
+        self.batch_size = options["batch_size"]
+        started = time.monotonic()
+        existing = CustomUser.objects.filter(
+            username__startswith=f"{self.prefix}_",
+        )
+        if options["clear"]:
+            existing.delete()
+        elif existing.exists():
+            raise CommandError(
+                f"Данные с префиксом {self.prefix} уже есть, "
+                "используйте --clear.",
+            )
+        if not Ingredient.objects.exists():
+            import_ingredients(options["path"], self.batch_size)
+        if not Tag.objects.exists():
+            call_command("load_tags", stdout=self.stdout)
+        with transaction.atomic():
+            users = self.create_users(options["users"])
+            recipes = self.create_recipes(users, options["recipes"])
+            follows = self.create_follows(users, options["follows"])
+            favorites = self.create_links(Favorite, users, recipes,
+                                          options["favorites"])
+            carts = self.create_links(Cart, users, recipes, options["carts"])
+            recount()
+            rebuild()
+        self.stdout.write("Обновление поиска и оценок рецептов...")
+        for recipe in Recipe.objects.filter(pk__in=recipes).iterator():
+            update_search_index(recipe)
+        refresh_scores(full=True)
+        cookable.bump_version()
+        bump_tags(RECIPES_TAG)
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано пользователей: {len(users)}, рецептов: {len(recipes)}, "
+            f"подписок: {follows}, в избранном: {favorites}, "
+            f"в корзинах: {carts} за {time.monotonic() - started:.1f} с. "
+            f"Пароль пользователей: {PASSWORD}.",
+        ))
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        users = CustomUser.objects.bulk_create(
+            (
+                CustomUser(
+                    username=f"{self.prefix}_{number}",
+                    email=f"{self.prefix}_{number}@example.com",
+                    first_name=f"Имя{number}",
+                    last_name=f"Фамилия{number}",
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        return [user.pk for user in users]
+
+    def create_recipes(self, users, count):
+        """Рецепты с 3-15 ингредиентами и 1-3 тегами."""
+        image = Recipe._meta.get_field("image")
+        image_name = image.storage.save(
+            f"{image.upload_to}{self.prefix}.png", ContentFile(IMAGE),
+        )
+        author_weights = zipf_weights(len(users), 0.8)
+        recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author_id=self.rng.choices(
+                        users, cum_weights=author_weights,
+                    )[0],
+                    name=" ".join(self.rng.sample(WORDS, 2)).capitalize(),
+                    text=" ".join(self.rng.choices(WORDS, k=40)),
+                    image=image_name,
+                    cooking_time=self.rng.randint(5, 180),
+                )
+                for _ in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        ingredients = list(
+            Ingredient.objects.order_by("pk").values_list("pk", flat=True),
+        )
+        self.rng.shuffle(ingredients)
+        ingredient_weights = zipf_weights(len(ingredients))
+        tags = list(Tag.objects.order_by("pk").values_list("pk", flat=True))
+        amounts = []
+        recipe_tags = []
+        for recipe in recipes:
+            size = round(self.rng.triangular(3, 15, 7))
+            for ingredient in sample(
+                self.rng, ingredients, ingredient_weights, size,
+            ):
+                amounts.append(AmountIngredient(
+                    recipe=recipe,
+                    ingredient_id=ingredient,
+                    amount=self.rng.randint(1, 500),
+                ))
+            for tag in self.rng.sample(tags, self.rng.randint(1, len(tags))):
+                recipe_tags.append(
+                    Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag),
+                )
+        AmountIngredient.objects.bulk_create(
+            amounts, batch_size=self.batch_size,
+        )
+        Recipe.tags.through.objects.bulk_create(
+            recipe_tags, batch_size=self.batch_size,
+        )
+        return [recipe.pk for recipe in recipes]
+
+    def create_follows(self, users, average):
+        """Подписки чаще на первых, самых активных авторов."""
+        weights = zipf_weights(len(users), 0.8)
+        subscriptions = []
+        for user in users:
+            count = min(
+                round(self.rng.expovariate(1 / average)) if average else 0,
+                len(users) - 1,
+            )
+            for author in sample(self.rng, users, weights, count):
+                if author != user:
+                    subscriptions.append(
+                        Subscription(user_id=user, author_id=author),
+                    )
+        Subscription.objects.bulk_create(
+            subscriptions, batch_size=self.batch_size,
+        )
+        return len(subscriptions)
+
+    def create_links(self, model, users, recipes, average):
+        """Избранное или корзины с популярными рецептами чаще."""
+        weights = zipf_weights(len(recipes))
+        links = []
+        for user in users:
+            count = round(self.rng.expovariate(1 / average)) if average else 0
+            for recipe in sample(self.rng, recipes, weights, count):
+                links.append(model(user_id=user, recipe_id=recipe))
+        model.objects.bulk_create(links, batch_size=self.batch_size)
+        return len(links)
@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core import validators
 from django.db import models
 
+from recipes.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -49,6 +52,12 @@ class Ingredient(models.Model):
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
         ordering = ("name",)
+        constraints = (
+            models.UniqueConstraint(
+                fields=["name", "measurement_unit"],
+                name="unique_ingredient_name_and_unit",
+            ),
+        )
 
     def __str__(self):
         return f"{self.name}, {self.measurement_unit}."
@@ -70,6 +79,13 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name="Изображение блюда",
         upload_to="static/recipe_images/",
+        storage=ContentAddressedStorage(),
+    )
+    image_renditions = models.JSONField(
+        verbose_name="Уменьшенные копии изображения",
+        default=dict,
+        blank=True,
+        editable=False,
     )
     text = models.TextField(
         verbose_name="Описание рецепта",
@@ -99,11 +115,36 @@ class Recipe(models.Model):
         verbose_name="Дата публикации",
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        verbose_name="Дата изменения",
+        auto_now=True,
+    )
+    search_vector = SearchVectorField(
+        verbose_name="Поисковый вектор",
+        null=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="В избранном",
+        default=0,
+        editable=False,
+    )
+    carts_count = models.PositiveIntegerField(
+        verbose_name="В корзинах",
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-pub_date",)
+        indexes = (
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="recipe_pub_date_id_idx",
+            ),
+        )
 
     def __str__(self):
         return f"{self.name}, {self.author.username}."
@@ -155,6 +196,10 @@ class Favorite(models.Model):
         verbose_name="Пользователь",
         on_delete=models.CASCADE,
     )
+    created_at = models.DateTimeField(
+        verbose_name="Дата добавления",
+        auto_now_add=True,
+    )
 
     class Meta:
         verbose_name = "Избранное"
@@ -186,6 +231,10 @@ class Cart(models.Model):
         related_name="cart_user",
         on_delete=models.CASCADE,
     )
+    created_at = models.DateTimeField(
+        verbose_name="Дата добавления",
+        auto_now_add=True,
+    )
 
     class Meta:
         verbose_name = "Покупка"
@@ -199,3 +248,111 @@ class Cart(models.Model):
 
     def __str__(self):
         return f"{self.user.username}, {self.recipe.name}."
+
+
+class ShoppingListItem(models.Model):
+    """Строка списка покупок пользователя.
+
+    Сумма количества ингредиента по всем рецептам в корзине
+    пользователя. Единица измерения задана ингредиентом. Строки
+    меняются вместе с корзиной и ингредиентами рецептов,
+    recipes_count - число рецептов корзины с этим ингредиентом,
+    при нуле строка удаляется. После изменений в админке список
+    пересчитывает команда rebuild_shopping_lists.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name="Пользователь",
+        related_name="shopping_list",
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name="Ингредиент",
+        related_name="shopping_list_items",
+        on_delete=models.CASCADE,
+    )
+    amount = models.IntegerField(
+        verbose_name="Количество",
+        default=0,
+    )
+    recipes_count = models.IntegerField(
+        verbose_name="Количество рецептов",
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = "Строка списка покупок"
+        verbose_name_plural = "Списки покупок"
+        constraints = (
+            models.UniqueConstraint(
+                fields=["user", "ingredient"],
+                name="unique_shopping_list_item",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.user.username}, {self.ingredient}: {self.amount}."
+
+
+class RecipeScore(models.Model):
+    """Предрассчитанные оценки популярности рецепта.
+
+    popular - взвешенная сумма добавлений в избранное и в корзину,
+    trending - log2 суммы тех же добавлений, вес которых убывает
+    вдвое за каждый период полураспада. Оценки пересчитывает
+    команда refresh_scores.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name="Рецепт",
+        related_name="score",
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    popular = models.PositiveIntegerField(
+        verbose_name="Популярность",
+        default=0,
+    )
+    trending = models.FloatField(
+        verbose_name="Популярность за последнее время",
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = "Оценка рецепта"
+        verbose_name_plural = "Оценки рецептов"
+        indexes = (
+            models.Index(
+                fields=["-popular"], name="recipe_score_popular_idx",
+            ),
+            models.Index(
+                fields=["-trending"], name="recipe_score_trending_idx",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.recipe}: {self.popular}, {self.trending:.2f}."
+
+
+class ScoreCheckpoint(models.Model):
+    """Последняя учтенная в оценках запись избранного или корзины."""
+
+    source = models.CharField(
+        verbose_name="Источник",
+        max_length=100,
+        unique=True,
+    )
+    last_id = models.PositiveBigIntegerField(
+        verbose_name="Последний id",
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = "Позиция пересчета оценок"
+        verbose_name_plural = "Позиции пересчета оценок"
+
+    def __str__(self):
+        return f"{self.source}: {self.last_id}."
@@ -0,0 +1,155 @@
+import math
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+
+from recipes.cache_tags import RECIPES_TAG, bump_tags
+from recipes.models import Cart, Favorite, Recipe, RecipeScore, ScoreCheckpoint
+
+WEIGHTS = {
+    Favorite: 2,
+    Cart: 1,
+}
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+ORDERINGS = {
+    "popular": ("-score__popular", "-pub_date", "-id"),
+    "trending": ("-score__trending", "-pub_date", "-id"),
+}
+
+
+def order_by_score(queryset, name):
+    """Рецепты queryset по убыванию оценки name.
+
+    Оценки присоединяются внутренним соединением по NOT NULL
+    столбцу, поэтому сортировку выполняют индексы
+    recipe_score_*_idx. Строку оценки нового рецепта создает сигнал,
+    а для рецептов, загруженных в обход модели, - refresh_scores,
+    который запускается при деплое.
+    """
+    return queryset.filter(score__isnull=False).order_by(*ORDERINGS[name])
+
+
+def log2_add(first, second):
+    """log2(2 ** first + 2 ** second) без переполнения."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def get_event_value(model, created_at):
+    """log2 веса добавления с поправкой на время.
+
+    Вес удваивается за каждый период полураспада, прошедший
+    с EPOCH. Так оценки можно накапливать без пересчета старых
+    добавлений: их относительный вес убывает сам собой.
+    """
+    half_life = timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS)
+    return math.log2(WEIGHTS[model]) + (created_at - EPOCH) / half_life
+
+
+def popular_expression(prefix=""):
+    return (
+        F(f"{prefix}favorites_count") * WEIGHTS[Favorite]
+        + F(f"{prefix}carts_count") * WEIGHTS[Cart]
+    )
+
+
+def create_missing_scores():
+    """Создает оценки для рецептов, у которых их еще нет."""
+    RecipeScore.objects.bulk_create(
+        (
+            RecipeScore(recipe_id=pk)
+            for pk in Recipe.objects.filter(
+                score__isnull=True,
+            ).values_list("pk", flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def refresh_popular():
+    """Переносит в оценки счетчики избранного и корзин.
+
+    Обновляются только разошедшиеся оценки, поэтому удаления
+    из избранного и корзины тоже учитываются.
+    """
+    stale = RecipeScore.objects.exclude(
+        popular=popular_expression("recipe__"),
+    )
+    return RecipeScore.objects.filter(
+        pk__in=Subquery(stale.values("pk")),
+    ).update(
+        popular=Subquery(
+            Recipe.objects.filter(pk=OuterRef("pk")).values(
+                popular=popular_expression(),
+            )[:1],
+        ),
+    )
+
+
+def collect_events(model, full):
+    """Суммы новых добавлений по рецептам.
+
+    Читаются только записи после сохраненной позиции, позиция
+    сдвигается на последнюю прочитанную запись.
+    """
+    checkpoint, _ = ScoreCheckpoint.objects.select_for_update().get_or_create(
+        source=model._meta.label_lower,
+    )
+    if full:
+        checkpoint.last_id = 0
+    events = {}
+    rows = model.objects.filter(pk__gt=checkpoint.last_id).order_by(
+        "pk",
+    ).values_list("pk", "recipe_id", "created_at")
+    for pk, recipe_id, created_at in rows.iterator():
+        value = get_event_value(model, created_at)
+        if recipe_id in events:
+            value = log2_add(events[recipe_id], value)
+        events[recipe_id] = value
+        checkpoint.last_id = pk
+    checkpoint.save(update_fields=("last_id",))
+    return events
+
+
+def refresh_trending(full=False):
+    """Добавляет к оценкам новые записи избранного и корзин.
+
+    При full=True оценки считаются заново по всем записям.
+    """
+    if full:
+        RecipeScore.objects.update(trending=0)
+    events = {}
+    for model in WEIGHTS:
+        for recipe_id, value in collect_events(model, full).items():
+            if recipe_id in events:
+                value = log2_add(events[recipe_id], value)
+            events[recipe_id] = value
+    scores = RecipeScore.objects.in_bulk(list(events))
+    for recipe_id, score in scores.items():
+        value = events[recipe_id]
+        # Нулевая оценка означает, что добавлений еще не было.
+        if score.trending:
+            value = log2_add(score.trending, value)
+        score.trending = value
+    RecipeScore.objects.bulk_update(
+        scores.values(), ("trending",), batch_size=1000,
+    )
+    return len(scores)
+
+
+def refresh_scores(full=False):
+    """Пересчитывает оценки рецептов.
+
+    Возвращает количество рецептов с обновленной популярностью
+    и популярностью за последнее время.
+    """
+    with transaction.atomic():
+        create_missing_scores()
+        popular = refresh_popular()
+        trending = refresh_trending(full)
+    if popular or trending:
+        bump_tags(RECIPES_TAG)
+    return popular, trending
@@ -0,0 +1,142 @@
+import re
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connection, connections
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from recipes.models import Ingredient, Recipe
+
+SEARCH_CONFIG = "russian"
+FTS_TABLE = f"{Recipe._meta.db_table}_fts"
+
+
+def create_search_backend(using="default", **kwargs):
+    """Создает служебные объекты полнотекстового поиска.
+
+    В PostgreSQL это расширение pg_trgm и GIN-индексы по поисковому
+    вектору и триграммам названия, в SQLite - таблица FTS5.
+    Вызывается по сигналу post_migrate.
+    """
+    database = connections[using]
+    table = Recipe._meta.db_table
+    with database.cursor() as cursor:
+        if database.vendor == "postgresql":
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_search_vector_gin "
+                f"ON {table} USING gin (search_vector)",
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_name_trgm_gin "
+                f"ON {table} USING gin (name gin_trgm_ops)",
+            )
+        elif database.vendor == "sqlite":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                "USING fts5(name, text, ingredients, "
+                "tokenize='unicode61 remove_diacritics 2')",
+            )
+
+
+def update_search_index(recipe):
+    """Пересчитывает поисковые данные рецепта.
+
+    В поиск попадают название, описание и названия ингредиентов.
+    """
+    ingredients = " ".join(
+        Ingredient.objects.filter(
+            amount_ingredient__recipe=recipe,
+        ).values_list("name", flat=True),
+    )
+    if connection.vendor == "postgresql":
+        Recipe.objects.filter(pk=recipe.pk).update(
+            search_vector=(
+                SearchVector("name", weight="A", config=SEARCH_CONFIG)
+                + SearchVector("text", weight="B", config=SEARCH_CONFIG)
+                + SearchVector(
+                    Value(ingredients), weight="C", config=SEARCH_CONFIG,
+                )
+            ),
+        )
+    elif connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [recipe.pk],
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, text, ingredients) "
+                "VALUES (%s, %s, %s, %s)",
+                [recipe.pk, recipe.name, recipe.text, ingredients],
+            )
+
+
+def remove_from_search_index(recipe):
+    """Удаляет рецепт из таблицы FTS5."""
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [recipe.pk],
+            )
+
+
+def missing_from_search_index(queryset):
+    """Рецепты queryset, которых еще нет в поисковом индексе."""
+    if connection.vendor == "postgresql":
+        return queryset.filter(search_vector__isnull=True)
+    if connection.vendor == "sqlite":
+        return queryset.exclude(
+            pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE}", ()),
+        )
+    return queryset.none()
+
+
+def search_recipes(queryset, text):
+    """Поиск рецептов с сортировкой по релевантности."""
+    text = text.strip()
+    if not text:
+        return queryset
+    if connection.vendor == "postgresql":
+        query = SearchQuery(
+            text, config=SEARCH_CONFIG, search_type="websearch",
+        )
+        return queryset.annotate(
+            rank=(
+                SearchRank(F("search_vector"), query)
+                + TrigramSimilarity("name", text)
+            ),
+        ).filter(
+            Q(search_vector=query) | Q(name__trigram_similar=text),
+        ).order_by("-rank", "-pub_date")
+    if connection.vendor == "sqlite":
+        return search_recipes_sqlite(queryset, text)
+    return queryset.filter(
+        Q(name__icontains=text)
+        | Q(text__icontains=text)
+        | Q(ingredients__name__icontains=text),
+    ).distinct()
+
+
+def search_recipes_sqlite(queryset, text):
+    """Поиск по таблице FTS5 для локальной разработки.
+
+    Каждое слово запроса ищется по началу, результаты
+    упорядочиваются по bm25 с приоритетом названия.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return queryset.none()
+    match = " ".join(f'"{word}"*' for word in words)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, 10.0, 5.0, 1.0)",
+            [match],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+    if not ids:
+        return queryset.none()
+    return queryset.filter(pk__in=ids).order_by(
+        Case(*(When(pk=pk, then=position) for position, pk in enumerate(ids))),
+    )
@@ -0,0 +1,137 @@
+from django.db import connection
+from django.db.models import Exists, OuterRef
+
+from recipes.models import AmountIngredient, Cart, Recipe, ShoppingListItem
+
+ITEMS = ShoppingListItem._meta.db_table
+AMOUNTS = AmountIngredient._meta.db_table
+CARTS = Cart._meta.db_table
+RECIPES = Recipe._meta.db_table
+
+# Вставка строк списков покупок из SELECT с суммированием при конфликте.
+# ON CONFLICT DO UPDATE поддерживают PostgreSQL и SQLite 3.24+.
+UPSERT = (
+    f"INSERT INTO {ITEMS} (user_id, ingredient_id, amount, recipes_count) "
+    "{select} "
+    "ON CONFLICT (user_id, ingredient_id) DO UPDATE SET "
+    f"amount = {ITEMS}.amount + excluded.amount, "
+    f"recipes_count = {ITEMS}.recipes_count + excluded.recipes_count"
+)
+USER_SELECT = (
+    "SELECT %s, amounts.ingredient_id, %s * SUM(amounts.amount), "
+    f"%s * COUNT(*) FROM {AMOUNTS} amounts "
+    "WHERE amounts.recipe_id IN ({recipes}) "
+    "GROUP BY amounts.ingredient_id"
+)
+CARTS_SELECT = (
+    "SELECT carts.user_id, amounts.ingredient_id, "
+    "%s * SUM(amounts.amount), %s * COUNT(*) "
+    f"FROM {CARTS} carts JOIN {AMOUNTS} amounts "
+    "ON amounts.recipe_id = carts.recipe_id "
+    "WHERE {where} "
+    "GROUP BY carts.user_id, amounts.ingredient_id"
+)
+
+
+def placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def lock_recipes(recipe_ids, exclusive=False):
+    """Блокирует строки рецептов до конца транзакции.
+
+    Изменение ингредиентов рецепта берет исключительную блокировку,
+    изменение корзин - разделяемую FOR KEY SHARE. Поэтому пересчет
+    списков по корзинам рецепта и добавление или удаление рецепта
+    в корзине выполняются по очереди и каждое видит результат
+    другого, а корзины разных пользователей друг друга не ждут.
+    В SQLite записывающие транзакции и так выполняются по одной.
+    """
+    recipe_ids = sorted(recipe_ids)
+    if connection.vendor != "postgresql" or not recipe_ids:
+        return
+    mode = "UPDATE" if exclusive else "KEY SHARE"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id FROM {RECIPES} "
+            f"WHERE id IN ({placeholders(recipe_ids)}) "
+            f"ORDER BY id FOR {mode}",
+            recipe_ids,
+        )
+
+
+def change_user_list(user_id, recipe_ids, sign):
+    """Меняет список покупок пользователя на ингредиенты рецептов.
+
+    sign=1 добавляет количества, sign=-1 вычитает. Вызывается
+    в одной транзакции с изменением корзины. Суммы меняются в базе
+    одним запросом, поэтому одновременные изменения не теряются.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    lock_recipes(recipe_ids)
+    select = USER_SELECT.format(recipes=placeholders(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT.format(select=select),
+            [user_id, sign, sign, *recipe_ids],
+        )
+    if sign < 0:
+        ShoppingListItem.objects.filter(
+            user_id=user_id, recipes_count__lte=0,
+        ).delete()
+
+
+def change_recipe_lists(recipe_id, sign):
+    """Меняет списки покупок всех пользователей с рецептом в корзине.
+
+    При изменении ингредиентов рецепта старые количества вычитаются
+    до изменения, новые добавляются после, затем remove_empty
+    удаляет опустевшие строки. Перед вычитанием рецепт блокируется
+    через lock_recipes(..., exclusive=True).
+    """
+    select = CARTS_SELECT.format(where="carts.recipe_id = %s")
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT.format(select=select), [sign, sign, recipe_id])
+
+
+def remove_empty(recipe_id):
+    """Удаляет строки без рецептов у пользователей с рецептом в корзине."""
+    ShoppingListItem.objects.filter(
+        user__cart_user__recipe_id=recipe_id, recipes_count__lte=0,
+    ).delete()
+
+
+def users_without_lists():
+    """Id пользователей с непустой корзиной, но без списка покупок.
+
+    Так бывает с корзинами, собранными до появления таблицы списков.
+    """
+    return Cart.objects.exclude(
+        Exists(ShoppingListItem.objects.filter(user_id=OuterRef("user_id"))),
+    ).values_list("user_id", flat=True).distinct()
+
+
+def rebuild(user_ids=None):
+    """Пересчитывает списки покупок пользователей по корзинам.
+
+    Без user_ids пересчитываются списки всех пользователей.
+    Возвращает количество строк в пересчитанных списках.
+    """
+    items = ShoppingListItem.objects.all()
+    where = "TRUE"
+    params = [1, 1]
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        items = items.filter(user_id__in=user_ids)
+        where = f"carts.user_id IN ({placeholders(user_ids)})"
+        params += user_ids
+    items.delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT.format(select=CARTS_SELECT.format(where=where)), params,
+        )
+    return items.count()
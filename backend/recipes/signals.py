@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes import cookable
+from recipes.ingredient_index import bump_version
+from recipes.models import (AmountIngredient, Cart, Ingredient, Recipe,
+                            RecipeScore)
+from recipes.search import remove_from_search_index, update_search_index
+from recipes.shopping_list import (change_recipe_lists, change_user_list,
+                                   remove_empty)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    """Сбрасывает индекс ингредиентов после их изменения."""
+    bump_version()
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_ingredient_recipes(sender, instance, created, **kwargs):
+    """Обновляет поиск по рецептам после переименования ингредиента."""
+    if created:
+        return
+    for recipe in Recipe.objects.filter(ingredients=instance):
+        update_search_index(recipe)
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_score(sender, instance, created, **kwargs):
+    """Создает пустые оценки популярности нового рецепта."""
+    if created:
+        RecipeScore.objects.create(recipe=instance)
+
+
+@receiver(post_save, sender=Recipe)
+def reindex_recipe(sender, instance, **kwargs):
+    """Обновляет поисковые данные сохраненного рецепта.
+
+    Ингредиенты меняются после сохранения рецепта, поэтому
+    сериализатор и админка после них обновляют индекс еще раз.
+    """
+    update_search_index(instance)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=AmountIngredient)
+@receiver(post_delete, sender=AmountIngredient)
+def invalidate_cookable_index(sender, **kwargs):
+    """Сбрасывает индекс ингредиентов рецептов после фиксации транзакции.
+
+    Ингредиенты рецепта создаются и меняются пакетно, без сигналов,
+    в одной транзакции с сохранением рецепта.
+    """
+    transaction.on_commit(cookable.bump_version)
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+    """Удаляет рецепт из поискового индекса."""
+    remove_from_search_index(instance)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_lists(sender, instance, **kwargs):
+    """Вычитает ингредиенты удаляемого рецепта из списков покупок.
+
+    Выполняется до удаления, пока записи корзин и ингредиентов
+    рецепта еще существуют, в том числе при каскадном удалении
+    рецептов вместе с автором.
+    """
+    change_recipe_lists(instance.pk, -1)
+    remove_empty(instance.pk)
+
+
+def is_cart_origin(origin):
+    """Начато ли удаление с самой записи или выборки корзины."""
+    if isinstance(origin, QuerySet):
+        return origin.model is Cart
+    return isinstance(origin, Cart)
+
+
+@receiver(post_save, sender=Cart)
+def add_cart_to_list(sender, instance, created, **kwargs):
+    """Добавляет ингредиенты рецепта в список покупок пользователя.
+
+    Записи корзины, вставленные и удаленные запросами из
+    recipes.links, сигналов не отправляют, списки для них
+    меняет вызывающий код.
+    """
+    if created:
+        change_user_list(instance.user_id, (instance.recipe_id,), 1)
+
+
+@receiver(post_delete, sender=Cart)
+def remove_cart_from_list(sender, instance, origin=None, **kwargs):
+    """Вычитает ингредиенты рецепта из списка покупок пользователя.
+
+    При удалении рецепта списки меняет remove_recipe_from_lists,
+    а при удалении пользователя его список удаляется каскадом.
+    """
+    if is_cart_origin(origin):
+        change_user_list(instance.user_id, (instance.recipe_id,), -1)
@@ -0,0 +1,43 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, именующее файлы по SHA-256 их содержимого.
+
+    Одинаковые файлы сохраняются один раз и дальше не меняются.
+    Файлы, на которые больше нет ссылок, удаляет команда
+    collect_images.
+    """
+
+    def get_hashed_name(self, name, content):
+        """Имя вида <каталог>/<xx>/<sha256>.<расширение>."""
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        hexdigest = digest.hexdigest()
+        return os.path.join(
+            directory, hexdigest[:2], f"{hexdigest}{extension}",
+        ).replace("\\", "/")
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.get_hashed_name(name, content)
+        # Совпавший файл помечается как свежий, чтобы collect_images
+        # не удалил его в окне --grace, пока на него еще нет ссылки.
+        # Если файл удален между проверками, он сохраняется заново.
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return super().save(name, content, max_length=max_length)
+        return name
@@ -7,7 +7,11 @@ from users.models import CustomUser, Subscription
 class UserAdmin(admin.ModelAdmin):
     """Настройка административной панели пользователей."""
 
-    list_display = ("id", "username", "first_name", "last_name", "email")
+    list_display = (
+        "id", "username", "first_name", "last_name", "email",
+        "recipes_count", "followers_count",
+    )
+    readonly_fields = ("recipes_count", "followers_count")
     search_fields = ("email", "username", "first_name", "last_name")
     list_filter = ("email", "first_name")
 